@@ -0,0 +1,114 @@
+import re
+
+import numpy as np
+from django.db.models import F, Q
+
+from core.ai.chroma import openai_ef
+
+from .models import AnswerCache
+
+# Minimum cosine similarity for two questions to share an answer
+SIMILARITY_THRESHOLD = 0.92
+# Most recent entries compared per lookup
+MAX_CANDIDATES = 200
+# Words pointing back at earlier turns ("pasal tersebut", "yang tadi")
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(tersebut|tadi|barusan|sebelumnya|di atas|lebih lanjut|maksudnya"
+    r"|bagaimana dengan|kalau begitu|kalau gitu|yang sama)\b",
+    re.IGNORECASE,
+)
+# Questions this short ("kenapa?", "contohnya?") only make sense in context
+MIN_STANDALONE_WORDS = 3
+
+
+def embed_question(question: str) -> np.ndarray:
+    embedding = np.asarray(openai_ef([question])[0], dtype=np.float32)
+    return embedding / (np.linalg.norm(embedding) or 1.0)
+
+
+def is_follow_up(question: str) -> bool:
+    """
+    Whether the question refers back to the conversation. Its answer
+    depends on earlier turns, so it is neither looked up nor cached;
+    standalone questions are, however long the conversation already is.
+    """
+    if len(question.split()) < MIN_STANDALONE_WORDS:
+        return True
+    return bool(FOLLOW_UP_PATTERN.search(question))
+
+
+def _candidates(contract):
+    scope = Q(contract=contract)
+    # Identical contracts share answers only within the same owner
+    if contract.content_hash and contract.user_id:
+        scope |= Q(
+            contract_hash=contract.content_hash, contract__user_id=contract.user_id
+        )
+    return (
+        AnswerCache.objects.filter(scope)
+        .only("id", "embedding")
+        .order_by("-created_at")[:MAX_CANDIDATES]
+    )
+
+
+def _best_match(candidates, embedding: np.ndarray) -> AnswerCache | None:
+    if not candidates:
+        return None
+
+    matrix = np.vstack(
+        [
+            np.frombuffer(candidate.embedding, dtype=np.float32)
+            for candidate in candidates
+        ]
+    )
+    similarities = matrix @ embedding
+    best = int(np.argmax(similarities))
+    if similarities[best] < SIMILARITY_THRESHOLD:
+        return None
+    return candidates[best]
+
+
+def find_cached_answer(contract, embedding: np.ndarray) -> AnswerCache | None:
+    """
+    Returns the most similar cached answer for this contract, or for another
+    contract of the same user with identical content, if it clears
+    SIMILARITY_THRESHOLD.
+    """
+    match = _best_match(list(_candidates(contract)), embedding)
+    if match is None:
+        return None
+    AnswerCache.objects.filter(id=match.id).update(hits=F("hits") + 1)
+    return AnswerCache.objects.get(id=match.id)
+
+
+async def afind_cached_answer(contract, embedding: np.ndarray) -> AnswerCache | None:
+    """Async ORM counterpart of find_cached_answer."""
+    match = _best_match([entry async for entry in _candidates(contract)], embedding)
+    if match is None:
+        return None
+    await AnswerCache.objects.filter(id=match.id).aupdate(hits=F("hits") + 1)
+    return await AnswerCache.objects.aget(id=match.id)
+
+
+def _entry(contract, question, embedding, answer, references) -> AnswerCache:
+    return AnswerCache(
+        contract=contract,
+        contract_hash=contract.content_hash,
+        question=question,
+        embedding=np.asarray(embedding, dtype=np.float32).tobytes(),
+        answer=answer,
+        references=references,
+    )
+
+
+def store_answer(contract, question, embedding, answer, references) -> None:
+    _entry(contract, question, embedding, answer, references).save()
+
+
+async def astore_answer(contract, question, embedding, answer, references) -> None:
+    await _entry(contract, question, embedding, answer, references).asave()
+
+
+def invalidate_answers(contract_id) -> None:
+    """Drops the cached answers of a contract, e.g. when it is reprocessed."""
+    AnswerCache.objects.filter(contract_id=contract_id).delete()
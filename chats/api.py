@@ -1,10 +1,12 @@
 import os
 
-from django.http import JsonResponse
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
+from core.cache import acached, chat_namespace
+from core.pagination import InvalidCursor, akeyset_page, page_links, page_size
+from core.serialization import OrjsonResponse
 from documents.models import Contract
 
 from .models import Chat
@@ -12,23 +14,48 @@ from .models import Chat
 
 @method_decorator(csrf_exempt, name="dispatch")
 class ChatRetrieveAPI(View):
-    def get(self, request, contract_id, n=20, *args, **kwargs):
+    """
+    Chat history of a contract, newest first. `before` loads older
+    messages, `after` newer ones; see core.pagination.
+    """
+
+    async def get(self, request, contract_id, *args, **kwargs):
+        before = request.GET.get("before")
+        after = request.GET.get("after")
+        limit = page_size(request.GET.get("limit"))
+
+        async def load():
+            if not await Contract.objects.filter(id=contract_id).aexists():
+                return None
+
+            chats, has_more = await akeyset_page(
+                Chat.objects.filter(contract_id=contract_id).only(
+                    "id", "role", "message", "created_at"
+                ),
+                limit,
+                before=before,
+                after=after,
+            )
+            return {
+                "chats": [
+                    {
+                        "id": str(chat.id),
+                        "role": chat.role,
+                        "message": chat.message,
+                        "created_at": chat.created_at.isoformat(),
+                    }
+                    for chat in chats
+                ],
+                **page_links(chats, has_more, before=before, after=after),
+            }
+
         try:
-            contract = Contract.objects.get(id=contract_id)
-        except Contract.DoesNotExist:
-            return JsonResponse({"error": "Contract not found."}, status=404)
-
-        chats = Chat.objects.filter(contract=contract).order_by("created_at")[:n]
-
-        response = {
-            "chats": [
-                {
-                    "role": chat.role,
-                    "message": chat.message,
-                    "created_at": chat.created_at.isoformat(),
-                }
-                for chat in chats
-            ]
-        }
-
-        return JsonResponse(response)
+            response = await acached(
+                chat_namespace(contract_id), ("page", before, after, limit), load
+            )
+        except InvalidCursor as e:
+            return OrjsonResponse({"error": str(e)}, status=400)
+
+        if response is None:
+            return OrjsonResponse({"error": "Contract not found."}, status=404)
+        return OrjsonResponse(response)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ChatsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "chats"
+
+    def ready(self):
+        # Cache invalidation receivers
+        from . import signals  # noqa: F401
@@ -0,0 +1,194 @@
+import asyncio
+import traceback
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from core.methods import ProgressNotifier, send_chat_message
+from core.serialization import encode_frame
+from documents.models import Contract
+
+from .answer_cache import (
+    afind_cached_answer,
+    astore_answer,
+    embed_question,
+    is_follow_up,
+)
+from .jobs import achat_turn, ais_cancelled, arelease_chat
+from .memory import aload_conversation
+from .models import Chat
+from .tasks import (
+    build_chat_prompt,
+    process_chat,
+    retrieve_references,
+    summarize_chat_history,
+)
+
+# Streamed chunks between two cancellation checks
+CANCEL_CHECK_EVERY = 20
+
+_semaphore: asyncio.Semaphore | None = None
+# Strong references to running turns so they are not garbage collected
+_running: set[asyncio.Task] = set()
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.CHAT_ASYNC_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def submit_chat(message, contract_id, epoch) -> None:
+    """
+    Runs the chat turn on the event loop when CHAT_ASYNC_EXECUTION is on and
+    a concurrency slot is free; otherwise (or under overload) the turn is
+    enqueued on huey as before. Async turns run as background tasks so the
+    consumer keeps receiving (e.g. cancel requests) while they stream.
+    """
+    semaphore = _get_semaphore()
+    if not settings.CHAT_ASYNC_EXECUTION or semaphore.locked():
+        await sync_to_async(process_chat)(message, contract_id, epoch)
+        return
+
+    await semaphore.acquire()
+    task = asyncio.create_task(_run_turn(message, contract_id, epoch))
+    task.add_done_callback(lambda _: semaphore.release())
+    _track(task)
+    task.add_done_callback(lambda task: _report_failure(task, contract_id))
+
+
+def _track(task: asyncio.Task) -> None:
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+
+
+def _report_failure(task: asyncio.Task, contract_id) -> None:
+    """Logs a failed turn and tells the contract's clients it failed."""
+    if task.cancelled() or task.exception() is None:
+        return
+    print(f"Chat turn for contract {contract_id} failed:")
+    traceback.print_exception(task.exception())
+    _track(asyncio.create_task(_send_failure(contract_id)))
+
+
+async def _send_failure(contract_id) -> None:
+    notifier = ProgressNotifier(contract_id=contract_id)
+    try:
+        await asyncio.to_thread(notifier.notify, "Chat Processing", "Chat failed", True)
+        await get_channel_layer().group_send(
+            f"chat_{contract_id}",
+            {
+                "type": "send_message",
+                "frame": encode_frame(
+                    {
+                        "error": "Gagal memproses pesan, silakan coba lagi.",
+                        "sender": "assistant",
+                    }
+                ),
+            },
+        )
+    except Exception as e:
+        print(f"Could not report failed chat turn for contract {contract_id}: {e}")
+
+
+async def _run_turn(message, contract_id, epoch):
+    if await ais_cancelled(contract_id, epoch):
+        await arelease_chat(contract_id, message)
+        return
+    async with achat_turn(contract_id) as acquired:
+        if not acquired:
+            # Another turn of the contract is running; huey retries this one
+            # after it instead of holding a concurrency slot meanwhile
+            await sync_to_async(process_chat)(message, contract_id, epoch)
+            return
+        try:
+            await answer_chat_async(message, contract_id, epoch)
+        finally:
+            await arelease_chat(contract_id, message)
+
+
+async def answer_chat_async(message, contract_id, epoch=None):
+    """
+    Async counterpart of chats.tasks.answer_chat: ORM access goes through
+    the async ORM, blocking retrieval runs in a thread, and the LLM answer
+    is streamed to the chat group as it is generated.
+    """
+    notifier = ProgressNotifier(contract_id=contract_id)
+
+    async def notify(content, final=False):
+        await asyncio.to_thread(notifier.notify, "Chat Processing", content, final)
+
+    await notify("Processing Chat Message")
+    # Follow-ups depend on earlier turns and skip the answer cache
+    follow_up = is_follow_up(message)
+    question = await Chat.objects.acreate(
+        role="user", message=message, contract_id=contract_id
+    )
+    contract = await Contract.objects.aget(id=contract_id)
+
+    cached = None
+    if not follow_up:
+        question_embedding = await asyncio.to_thread(embed_question, message)
+        cached = await afind_cached_answer(contract, question_embedding)
+    if cached:
+        await notify("Answer found in cache", final=True)
+        await _finish(contract_id, cached.answer, cached.references)
+        return
+
+    await notify("Searching for UU Collection")
+    reference_chunks, pasal_numbers = await asyncio.to_thread(
+        retrieve_references, message
+    )
+    history_summary, chats = await aload_conversation(contract_id)
+    # raw_text is loaded lazily from the artifact store
+    contract_text = await sync_to_async(lambda: contract.raw_text)()
+    pm = build_chat_prompt(
+        message, contract_text, reference_chunks, history_summary, chats
+    )
+
+    if await ais_cancelled(contract_id, epoch):
+        # A cancelled turn leaves no unanswered question in the history
+        await question.adelete()
+        await notify("Chat cancelled", final=True)
+        return
+
+    await notify("Calling LLM")
+    channel_layer = get_channel_layer()
+    parts = []
+    async for delta in pm.astream():
+        parts.append(delta)
+        await channel_layer.group_send(
+            f"chat_{contract_id}",
+            {
+                "type": "send_message_delta",
+                "frame": encode_frame({"delta": delta, "sender": "assistant"}),
+            },
+        )
+        if len(parts) % CANCEL_CHECK_EVERY == 0 and await ais_cancelled(
+            contract_id, epoch
+        ):
+            await question.adelete()
+            await notify("Chat cancelled", final=True)
+            return
+
+    assistant_message = "".join(parts)
+    await notify("Saving chat to database", final=True)
+    await _finish(contract_id, assistant_message, pasal_numbers)
+    if not follow_up:
+        await astore_answer(
+            contract, message, question_embedding, assistant_message, pasal_numbers
+        )
+
+
+async def _finish(contract_id, assistant_message, references):
+    await Chat.objects.acreate(
+        role="assistant", message=assistant_message, contract_id=contract_id
+    )
+    await asyncio.to_thread(
+        send_chat_message,
+        {"assistant_message": assistant_message, "references_numbers": references},
+        contract_id,
+    )
+    await sync_to_async(summarize_chat_history)(contract_id)
@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from redis.exceptions import LockError, RedisError
+
+from core.ai.embedding_cache import normalize_text
+from core.redis_client import async_redis_client, redis_client
+
+# Identical questions are deduped while one is queued or running
+INFLIGHT_TTL = 60 * 10
+# Longest a turn may hold its contract's turn lock
+TURN_LOCK_TIMEOUT = 60 * 5
+# Seconds before a turn that found its contract busy is tried again
+TURN_RETRY_DELAY = 3
+# Sockets refresh their presence every SOCKET_HEARTBEAT seconds; sockets
+# that died without disconnecting (e.g. a crashed server) expire after
+# SOCKET_TTL
+SOCKET_TTL = 60
+SOCKET_HEARTBEAT = 20
+# How long a contract may have no socket before its turns are cancelled;
+# well above the chat page's reconnect delay, so network blips survive
+DISCONNECT_GRACE = 30
+
+# Longest a history summary may hold its lock (one LLM call)
+SUMMARY_LOCK_TIMEOUT = 60 * 2
+
+# Strong references to pending abandonment checks
+_grace_checks: set[asyncio.Task] = set()
+
+
+def _inflight_key(contract_id, message) -> str:
+    digest = hashlib.sha256(normalize_text(message).lower().encode("utf-8"))
+    return f"chat:inflight:{contract_id}:{digest.hexdigest()}"
+
+
+def _epoch_key(contract_id) -> str:
+    return f"chat:epoch:{contract_id}"
+
+
+def _sockets_key(contract_id) -> str:
+    return f"chat:sockets:{contract_id}"
+
+
+async def claim_chat(contract_id, message) -> int | None:
+    """
+    Registers a question as in flight and returns the cancellation epoch the
+    job belongs to, or None if the same question is already queued/running.
+    """
+    try:
+        claimed = await async_redis_client.set(
+            _inflight_key(contract_id, message), 1, nx=True, ex=INFLIGHT_TTL
+        )
+        if not claimed:
+            return None
+        return int(await async_redis_client.get(_epoch_key(contract_id)) or 0)
+    except RedisError as e:
+        print(f"Chat job tracking unavailable for contract {contract_id}: {e}")
+        return 0
+
+
+async def cancel_chats(contract_id) -> None:
+    """Cancels every queued or running turn of the contract."""
+    try:
+        await async_redis_client.incr(_epoch_key(contract_id))
+    except RedisError as e:
+        print(f"Could not cancel chats for contract {contract_id}: {e}")
+
+
+async def socket_alive(contract_id, channel_name) -> None:
+    """Registers or refreshes a socket of the contract, valid for SOCKET_TTL."""
+    key = _sockets_key(contract_id)
+    try:
+        async with async_redis_client.pipeline(transaction=False) as pipe:
+            pipe.zadd(key, {channel_name: time.time() + SOCKET_TTL})
+            pipe.expire(key, SOCKET_TTL)
+            await pipe.execute()
+    except RedisError as e:
+        print(f"Chat job tracking unavailable for contract {contract_id}: {e}")
+
+
+async def live_sockets(contract_id) -> int:
+    key = _sockets_key(contract_id)
+    await async_redis_client.zremrangebyscore(key, "-inf", time.time())
+    return await async_redis_client.zcard(key)
+
+
+async def socket_disconnected(contract_id, channel_name) -> None:
+    """
+    Forgets the socket. If no socket of the contract is back within
+    DISCONNECT_GRACE, its turns are cancelled as nobody is left to
+    receive them.
+    """
+    try:
+        await async_redis_client.zrem(_sockets_key(contract_id), channel_name)
+    except RedisError as e:
+        print(f"Chat job tracking unavailable for contract {contract_id}: {e}")
+        return
+    task = asyncio.create_task(_cancel_if_abandoned(contract_id))
+    _grace_checks.add(task)
+    task.add_done_callback(_grace_checks.discard)
+
+
+async def _cancel_if_abandoned(contract_id) -> None:
+    await asyncio.sleep(DISCONNECT_GRACE)
+    try:
+        if await live_sockets(contract_id):
+            return
+    except RedisError:
+        return
+    await cancel_chats(contract_id)
+
+
+def is_cancelled(contract_id, epoch) -> bool:
+    if epoch is None:
+        return False
+    try:
+        return int(redis_client.get(_epoch_key(contract_id)) or 0) != epoch
+    except RedisError:
+        return False
+
+
+async def ais_cancelled(contract_id, epoch) -> bool:
+    if epoch is None:
+        return False
+    try:
+        return int(await async_redis_client.get(_epoch_key(contract_id)) or 0) != epoch
+    except RedisError:
+        return False
+
+
+def release_chat(contract_id, message) -> None:
+    try:
+        redis_client.delete(_inflight_key(contract_id, message))
+    except RedisError:
+        pass
+
+
+async def arelease_chat(contract_id, message) -> None:
+    try:
+        await async_redis_client.delete(_inflight_key(contract_id, message))
+    except RedisError:
+        pass
+
+
+@contextmanager
+def chat_turn(contract_id):
+    """
+    Serialises the turns of a contract so answers are generated and appended
+    to the history in order. Yields whether the turn may run; callers that
+    find another turn running retry later instead of waiting for it. If
+    Redis is unavailable every turn runs.
+    """
+    lock = redis_client.lock(f"chat:lock:{contract_id}", timeout=TURN_LOCK_TIMEOUT)
+    try:
+        acquired = lock.acquire(blocking=False)
+    except RedisError as e:
+        print(f"Chat turn lock unavailable for contract {contract_id}: {e}")
+        yield True
+        return
+
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except (LockError, RedisError):
+                pass
+
+
+@contextmanager
+def summary_lock(contract_id):
+    """
+    Yields whether this caller may summarise the contract's history. Runs
+    that find another summary in progress skip it instead of folding the
+    same messages twice; if Redis is unavailable every caller proceeds.
+    """
+    lock = redis_client.lock(
+        f"chat:summary:{contract_id}", timeout=SUMMARY_LOCK_TIMEOUT
+    )
+    try:
+        acquired = lock.acquire(blocking=False)
+    except RedisError as e:
+        print(f"Chat summary lock unavailable for contract {contract_id}: {e}")
+        yield True
+        return
+
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except (LockError, RedisError):
+                pass
+
+
+@asynccontextmanager
+async def achat_turn(contract_id):
+    """Async counterpart of chat_turn; shares the same Redis lock."""
+    lock = async_redis_client.lock(
+        f"chat:lock:{contract_id}", timeout=TURN_LOCK_TIMEOUT
+    )
+    try:
+        acquired = await lock.acquire(blocking=False)
+    except RedisError as e:
+        print(f"Chat turn lock unavailable for contract {contract_id}: {e}")
+        yield True
+        return
+
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                await lock.release()
+            except (LockError, RedisError):
+                pass
@@ -0,0 +1,107 @@
+from django.utils import timezone
+
+from core.ai.prompt_manager import PromptManager
+from core.serialization import dumps_str
+
+from .jobs import summary_lock
+from .models import Chat, ChatMemory
+
+# Latest messages replayed verbatim on every turn
+MEMORY_WINDOW = 8
+# Unsummarised messages allowed beyond the window before they are folded
+SUMMARY_BATCH = 4
+# Upper bound of messages folded into the summary in a single pass
+MAX_SUMMARY_PASS = 40
+
+SUMMARY_PROMPT = """
+Kamu merangkum percakapan antara pengguna dan asisten hukum tentang sebuah kontrak kerja.
+Perbarui ringkasan sebelumnya dengan pesan-pesan baru yang diberikan.
+Pertahankan fakta penting: pertanyaan pengguna, pasal yang dirujuk, kesimpulan, dan hal yang belum terjawab.
+Tulis dalam Bahasa Indonesia, maksimal 200 kata, tanpa pembuka atau penutup.
+"""
+
+
+def _pending_chats(contract_id, memory: ChatMemory | None):
+    chats = Chat.objects.filter(contract_id=contract_id)
+    if memory and memory.summarized_until:
+        chats = chats.filter(created_at__gt=memory.summarized_until)
+    return chats
+
+
+def load_conversation(contract_id) -> tuple[str, list[Chat]]:
+    """
+    Returns the rolling summary of older turns and the newest messages that
+    are not part of it yet (oldest first). The number of replayed messages
+    is bounded by MEMORY_WINDOW + SUMMARY_BATCH.
+    """
+    memory = ChatMemory.objects.filter(contract_id=contract_id).first()
+    recent = _pending_chats(contract_id, memory).order_by("-created_at")[
+        : MEMORY_WINDOW + SUMMARY_BATCH
+    ]
+    summary = memory.summary if memory else ""
+    return summary, list(recent)[::-1]
+
+
+async def aload_conversation(contract_id) -> tuple[str, list[Chat]]:
+    """Async ORM counterpart of load_conversation for the ASGI chat path."""
+    memory = await ChatMemory.objects.filter(contract_id=contract_id).afirst()
+    recent = _pending_chats(contract_id, memory).order_by("-created_at")[
+        : MEMORY_WINDOW + SUMMARY_BATCH
+    ]
+    summary = memory.summary if memory else ""
+    return summary, [chat async for chat in recent][::-1]
+
+
+def update_summary(contract_id) -> None:
+    """
+    Folds the messages that slid out of the replay window into the stored
+    summary. Only the new tail is sent to the LLM, together with the previous
+    summary, and only once SUMMARY_BATCH messages have accumulated.
+
+    One run per contract at a time; the summary is only saved if no other
+    run moved summarized_until meanwhile, so it never moves backwards.
+    """
+    with summary_lock(contract_id) as acquired:
+        if acquired:
+            _update_summary(contract_id)
+
+
+def _update_summary(contract_id) -> None:
+    memory, _ = ChatMemory.objects.get_or_create(contract_id=contract_id)
+    pending = _pending_chats(contract_id, memory)
+
+    overflow = pending.count() - MEMORY_WINDOW
+    if overflow < SUMMARY_BATCH:
+        return
+
+    evicted = list(pending.order_by("created_at")[: min(overflow, MAX_SUMMARY_PASS)])
+
+    pm = PromptManager()
+    pm.add_message("system", SUMMARY_PROMPT.strip())
+    pm.add_message(
+        "user",
+        dumps_str(
+            {
+                "previous_summary": memory.summary,
+                "new_messages": [
+                    {"role": chat.role, "message": chat.message} for chat in evicted
+                ],
+            }
+        ),
+    )
+
+    try:
+        summary = pm.generate()
+    except Exception as e:
+        print(f"Error summarising chat history: {e}")
+        return
+
+    updated = ChatMemory.objects.filter(
+        id=memory.id, summarized_until=memory.summarized_until
+    ).update(
+        summary=summary,
+        summarized_until=evicted[-1].created_at,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        print(f"Chat summary of contract {contract_id} changed meanwhile, discarded")
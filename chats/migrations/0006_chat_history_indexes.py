@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chats", "0005_answercache"),
+        ("documents", "0005_contract_listing_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="chat",
+            name="contract",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="chats",
+                to="documents.contract",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chat",
+            index=models.Index(
+                fields=["contract", "created_at", "id"], name="chat_history_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="chat",
+            index=models.Index(
+                fields=["contract", "role", "created_at"], name="chat_role_created_idx"
+            ),
+        ),
+    ]
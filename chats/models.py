@@ -17,5 +17,55 @@ class Chat(BaseModel):
         max_length=50, choices=CHAT_ROLE_CHOICES, default=CHAT_ROLE_USER
     )
     contract = models.ForeignKey(
-        "documents.Contract", on_delete=models.SET_NULL, null=True
+        "documents.Contract",
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="chats",
     )
+
+    class Meta:
+        indexes = [
+            # History pages, newest first
+            models.Index(
+                fields=["contract", "created_at", "id"], name="chat_history_idx"
+            ),
+            # Latest message of a role (e.g. last assistant reply)
+            models.Index(
+                fields=["contract", "role", "created_at"], name="chat_role_created_idx"
+            ),
+        ]
+
+
+class ChatMemory(BaseModel):
+    """
+    Incrementally updated summary of the chat turns of a contract that no
+    longer fit in the replayed window. summarized_until is the created_at of
+    the newest Chat folded into the summary.
+    """
+
+    contract = models.OneToOneField(
+        "documents.Contract", on_delete=models.CASCADE, related_name="chat_memory"
+    )
+    summary = models.TextField(blank=True, default="")
+    summarized_until = models.DateTimeField(null=True, blank=True)
+
+
+class AnswerCache(BaseModel):
+    """
+    Previously generated answer to a standalone question of a contract chat.
+    Entries are matched by question embedding similarity, either on the same
+    contract or on another contract of the same user with the same
+    content_hash (identical template contracts).
+    """
+
+    contract = models.ForeignKey(
+        "documents.Contract", on_delete=models.CASCADE, related_name="cached_answers"
+    )
+    contract_hash = models.CharField(
+        max_length=64, blank=True, null=True, db_index=True
+    )
+    question = models.TextField()
+    embedding = models.BinaryField()
+    answer = models.TextField()
+    references = models.JSONField(default=list)
+    hits = models.PositiveIntegerField(default=0)
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import chat_namespace, invalidate
+
+from .models import Chat
+
+
+@receiver(post_save, sender=Chat)
+@receiver(post_delete, sender=Chat)
+def invalidate_chat_cache(instance, **kwargs):
+    if instance.contract_id:
+        invalidate(chat_namespace(instance.contract_id))
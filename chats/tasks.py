@@ -1,19 +1,23 @@
 import json
 
-from huey.contrib.djhuey import task
+from huey.exceptions import RetryTask
 from langchain.embeddings import OpenAIEmbeddings
 from langchain_experimental.text_splitter import SemanticChunker
 
+from chats.answer_cache import embed_question, find_cached_answer, is_follow_up, store_answer
+from chats.jobs import TURN_RETRY_DELAY, chat_turn, is_cancelled, release_chat
+from chats.memory import load_conversation, update_summary
 from chats.models import Chat
 from documents.models import Contract
 from core.ai.chroma import chroma, openai_ef
 from core.ai.mistral import mistral
 from core.ai.prompt_manager import PromptManager
-from core.methods import send_chat_message, send_notification
-from documents.preparation import ensure_uu_reference_collection
+from core.methods import ProgressNotifier, send_chat_message
+from core.queues import CHAT_PRIORITY, CHAT_SUMMARY_PRIORITY, chat_queue
+from documents.corpus import query_corpus
 
 SYSTEM_PROMPT = """
-Kamu adalah asisten hukum yang bertugas membandingkan isi kontrak kerja dengan peraturan dalam Undang-Undang Republik Indonesia Nomor 13 Tahun 2003
+Kamu adalah asisten hukum yang bertugas membandingkan isi kontrak kerja dengan peraturan ketenagakerjaan Indonesia, terutama Undang-Undang Republik Indonesia Nomor 13 Tahun 2003 beserta perubahan dan peraturan pelaksananya. Setiap referensi diawali judul peraturannya
 Berikut adalah hasil pencarian dari database dokumen yang relevan:
 
 ## Input yang Diterima
@@ -85,55 +89,130 @@ Jawaban Anda harus mengikuti struktur berikut:
 Jawaban harus dalam bahasa Indonesia formal, terstruktur dengan jelas menggunakan heading dan bullet points untuk meningkatkan keterbacaan.
 """
 
-@task()
-def process_chat(message, contract_id):
-    send_notification(notification_type="Chat Processing", content=f"Processing Chat Message")
-    max_chat_history = 20
-    Chat.objects.create(role="user", message=message, contract_id=contract_id)
+HISTORY_SUMMARY_PROMPT = """
+Ringkasan percakapan sebelumnya (pesan yang lebih lama tidak ditampilkan):
+{summary}
+"""
 
-    send_notification(notification_type="Chat Processing", content=f"Searching for Contract Collection")
-    contract = Contract.objects.get(id=contract_id)
-    full_contract_text = contract.raw_text
-    print(full_contract_text[:100])
-    send_notification(notification_type="Chat Processing", content=f"Contract Collection Found")
-
-    send_notification(notification_type="Chat Processing", content=f"Searching for UU Collection")
-    uu_collection = ensure_uu_reference_collection()
-    uu_result = uu_collection.query(query_texts=[message], n_results=2)
-    reference_chunks = "\n\n---\n\n".join(uu_result["documents"][0])
-    pasal_numbers = [m["pasal_number"] for m in uu_result["metadatas"][0]]
-    send_notification(notification_type="Chat Processing", content=f"UU Collection Found")
-
-    messages = []
-    send_notification(notification_type="Chat Processing", content=f"Query Chat History")
-    chats = Chat.objects.filter(contract_id=contract_id).order_by("created_at")[
-        :max_chat_history
+def retrieve_references(message) -> tuple[str, list[dict]]:
+    hits = query_corpus(message, n_results=2)
+    # Hits may come from several regulations; name the source of each
+    reference_chunks = "\n\n---\n\n".join(
+        f"{hit['metadata'].get('undang_undang_title', '')}\n{hit['document']}".strip()
+        for hit in hits
+    )
+    # Pasal numbers repeat across regulations; qualify each with its own
+    pasal_numbers = [
+        {"regulation": hit["regulation"], "pasal_number": hit["metadata"]["pasal_number"]}
+        for hit in hits
     ]
+    return reference_chunks, pasal_numbers
 
-    send_notification(notification_type="Chat Processing", content=f"Appending Chat History")
-    for chat in chats:
-        messages.append({"role": chat.role, "message": chat.message})
 
-    send_notification(notification_type="Chat Processing", content=f"Setting up prompt")
+def build_chat_prompt(message, contract_text, reference_chunks, history_summary, chats) -> PromptManager:
     system_prompt = SYSTEM_PROMPT.strip()
-    system_prompt = system_prompt.format(question=message, reference=reference_chunks, contract=full_contract_text)
-    print("\n\nsystem_prompt\n\n")
-    print(system_prompt)
+    system_prompt = system_prompt.format(question=message, reference=reference_chunks, contract=contract_text)
 
     pm = PromptManager(default_model="o4-mini")
     pm.add_message("system", system_prompt)
-    for msg in messages:
-        pm.add_message(msg["role"], msg["message"])
-
-    send_notification(notification_type="Chat Processing", content=f"Calling LLM")
+    if history_summary:
+        pm.add_message("system", HISTORY_SUMMARY_PROMPT.strip().format(summary=history_summary))
+    for chat in chats:
+        pm.add_message(chat.role, chat.message)
+    return pm
+
+
+@chat_queue.task(priority=CHAT_PRIORITY)
+def process_chat(message, contract_id, epoch=None):
+    """
+    Answers one chat turn. Turns of the same contract run one at a time: a
+    turn that finds another one running is retried after TURN_RETRY_DELAY
+    instead of holding a worker. Turns cancelled (superseded or abandoned)
+    before they start or before the LLM call are dropped.
+    """
+    if is_cancelled(contract_id, epoch):
+        print(f"Chat turn for contract {contract_id} cancelled before start")
+        release_chat(contract_id, message)
+        return
+    with chat_turn(contract_id) as acquired:
+        if not acquired:
+            raise RetryTask(delay=TURN_RETRY_DELAY)
+        try:
+            answer_chat(message, contract_id, epoch)
+        finally:
+            release_chat(contract_id, message)
+
+
+def answer_chat(message, contract_id, epoch=None):
+    notifier = ProgressNotifier(contract_id=contract_id)
+    notifier.notify(notification_type="Chat Processing", content=f"Processing Chat Message")
+    # Follow-ups depend on earlier turns and skip the answer cache
+    follow_up = is_follow_up(message)
+    question = Chat.objects.create(role="user", message=message, contract_id=contract_id)
+
+    notifier.notify(notification_type="Chat Processing", content=f"Searching for Contract Collection")
+    contract = Contract.objects.get(id=contract_id)
+    full_contract_text = contract.raw_text
+    print(full_contract_text[:100])
+    notifier.notify(notification_type="Chat Processing", content=f"Contract Collection Found")
+
+    cached = None
+    if not follow_up:
+        question_embedding = embed_question(message)
+        cached = find_cached_answer(contract, question_embedding)
+    if cached:
+        notifier.notify(notification_type="Chat Processing", content=f"Answer found in cache")
+        Chat.objects.create(
+            role="assistant", message=cached.answer, contract_id=contract_id
+        )
+        send_chat_message(
+            {
+                "assistant_message": cached.answer,
+                "references_numbers": cached.references,
+            },
+            contract_id,
+        )
+        notifier.close()
+        summarize_chat_history(contract_id)
+        return
+
+    notifier.notify(notification_type="Chat Processing", content=f"Searching for UU Collection")
+    reference_chunks, pasal_numbers = retrieve_references(message)
+    notifier.notify(notification_type="Chat Processing", content=f"UU Collection Found")
+
+    notifier.notify(notification_type="Chat Processing", content=f"Query Chat History")
+    history_summary, chats = load_conversation(contract_id)
+
+    notifier.notify(notification_type="Chat Processing", content=f"Setting up prompt")
+    pm = build_chat_prompt(message, full_contract_text, reference_chunks, history_summary, chats)
+
+    if is_cancelled(contract_id, epoch):
+        # A cancelled turn leaves no unanswered question in the history
+        question.delete()
+        notifier.notify(notification_type="Chat Processing", content=f"Chat cancelled", final=True)
+        notifier.close()
+        return
+
+    notifier.notify(notification_type="Chat Processing", content=f"Calling LLM")
     assistant_message = pm.generate()
     response = {
         "assistant_message": assistant_message,
         "references_numbers": pasal_numbers,
     }
 
-    send_notification(notification_type="Chat Processing", content=f"Saving chat to database")
+    notifier.notify(notification_type="Chat Processing", content=f"Saving chat to database")
     Chat.objects.create(
         role="assistant", message=assistant_message, contract_id=contract_id
     )
+    notifier.close()
     send_chat_message(response, contract_id)
+    if not follow_up:
+        store_answer(contract, message, question_embedding, assistant_message, pasal_numbers)
+
+    summarize_chat_history(contract_id)
+
+
+@chat_queue.task(priority=CHAT_SUMMARY_PRIORITY)
+def summarize_chat_history(contract_id):
+    # Off the critical path of the answer; queued behind pending chat turns
+    update_summary(contract_id)
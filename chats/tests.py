@@ -1,3 +1,115 @@
+from contextlib import contextmanager
+from unittest import mock
+
+import numpy as np
 from django.test import TestCase
+from huey.exceptions import RetryTask
+
+from documents.models import Contract
+
+from .answer_cache import is_follow_up
+from .models import AnswerCache, Chat
+from .tasks import answer_chat, process_chat
+
+QUESTION = "Berapa lama masa percobaan yang diatur dalam kontrak ini?"
+REFERENCES = [{"regulation": "uu_13_2003", "pasal_number": "60"}]
+
+
+class FollowUpTests(TestCase):
+    def test_standalone_questions(self):
+        self.assertFalse(is_follow_up(QUESTION))
+        self.assertFalse(is_follow_up("Apa itu PKWT menurut undang-undang?"))
+
+    def test_questions_referring_to_earlier_turns(self):
+        self.assertTrue(is_follow_up("Kenapa?"))
+        self.assertTrue(is_follow_up("Jelaskan pasal tersebut lebih rinci"))
+        self.assertTrue(is_follow_up("Bagaimana dengan upah lemburnya?"))
+
+
+class ChatTaskTestCase(TestCase):
+    """A contract with some history; retrieval, the LLM and sockets mocked."""
+
+    def setUp(self):
+        self.contract = Contract(file_name="kontrak.pdf", content_hash="abc")
+        self.contract.raw_text = "Masa percobaan tiga bulan."
+        self.contract.save()
+        Chat.objects.create(
+            role="user", message="Apa isi kontrak ini?", contract=self.contract
+        )
+        Chat.objects.create(
+            role="assistant", message="Kontrak kerja.", contract=self.contract
+        )
+
+        embedding = np.ones(4, dtype=np.float32) / 2
+        prompt = mock.Mock()
+        prompt.generate.return_value = "Tiga bulan."
+        self.prompt = prompt
+        for target, kwargs in (
+            ("embed_question", {"return_value": embedding}),
+            ("retrieve_references", {"return_value": ("Pasal 60", REFERENCES)}),
+            ("build_chat_prompt", {"return_value": prompt}),
+            ("send_chat_message", {}),
+            ("summarize_chat_history", {}),
+            ("ProgressNotifier", {}),
+        ):
+            patcher = mock.patch(f"chats.tasks.{target}", **kwargs)
+            setattr(self, target, patcher.start())
+            self.addCleanup(patcher.stop)
+
+
+class AnswerCacheTests(ChatTaskTestCase):
+    """Repeated questions are answered from the cache, with or without history."""
+
+    def test_repeated_question_with_history_is_served_from_cache(self):
+        answer_chat(QUESTION, self.contract.id)
+        answer_chat(QUESTION, self.contract.id)
+
+        self.prompt.generate.assert_called_once()
+        entry = AnswerCache.objects.get(contract=self.contract)
+        self.assertEqual(entry.hits, 1)
+        self.assertEqual(entry.references, REFERENCES)
+        self.send_chat_message.assert_called_with(
+            {"assistant_message": "Tiga bulan.", "references_numbers": REFERENCES},
+            self.contract.id,
+        )
+        self.assertEqual(
+            list(
+                Chat.objects.filter(contract=self.contract, role="assistant")
+                .order_by("created_at")
+                .values_list("message", flat=True)
+            ),
+            ["Kontrak kerja.", "Tiga bulan.", "Tiga bulan."],
+        )
+
+    def test_follow_up_is_neither_looked_up_nor_cached(self):
+        answer_chat("Kenapa pasal tersebut berlaku?", self.contract.id)
+        answer_chat("Kenapa pasal tersebut berlaku?", self.contract.id)
+
+        self.assertEqual(self.prompt.generate.call_count, 2)
+        self.embed_question.assert_not_called()
+        self.assertFalse(AnswerCache.objects.exists())
+
+
+class ChatTurnTests(ChatTaskTestCase):
+    """Serialised and cancelled turns."""
+
+    def test_turn_is_retried_while_another_runs(self):
+        @contextmanager
+        def busy(contract_id):
+            yield False
+
+        with mock.patch("chats.tasks.chat_turn", busy), mock.patch(
+            "chats.tasks.is_cancelled", return_value=False
+        ), mock.patch("chats.tasks.release_chat") as release_chat:
+            with self.assertRaises(RetryTask):
+                process_chat.call_local(QUESTION, self.contract.id, 0)
+        release_chat.assert_not_called()
+        self.prompt.generate.assert_not_called()
+
+    def test_cancelled_turn_leaves_no_question_in_history(self):
+        with mock.patch("chats.tasks.is_cancelled", return_value=True):
+            answer_chat(QUESTION, self.contract.id, epoch=0)
 
-# Create your tests here.
+        self.prompt.generate.assert_not_called()
+        self.assertFalse(Chat.objects.filter(message=QUESTION).exists())
+        self.assertEqual(Chat.objects.filter(contract=self.contract).count(), 2)
@@ -1,8 +1,12 @@
 from django.shortcuts import get_object_or_404
 from django.views.generic import TemplateView
 
+from core.pagination import keyset_page, page_links
 from documents.models import Contract
 
+# Messages rendered on open; older ones are fetched from ChatRetrieveAPI
+CHAT_PAGE_SIZE = 30
+
 
 class ChatView(TemplateView):
     template_name = "chats/index.html"
@@ -14,6 +18,8 @@ class ChatView(TemplateView):
         contract = get_object_or_404(Contract, id=contract_id)
 
         context["contract"] = contract
-        context["messages"] = contract.chats.all().order_by("created_at")
+        chats, has_more = keyset_page(contract.chats.all(), CHAT_PAGE_SIZE)
+        context["messages"] = chats[::-1]
+        context["older_cursor"] = page_links(chats, has_more)["next_cursor"]
 
         return context
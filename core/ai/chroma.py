@@ -1,11 +1,15 @@
 import os
 
 from chromadb import HttpClient
-from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
+
+from core.ai.embedding_cache import CachedOpenAIEmbeddingFunction, EmbeddingCache
 
 chroma = HttpClient(host="localhost", port=8010)
 
-openai_ef = OpenAIEmbeddingFunction(
+embedding_cache = EmbeddingCache()
+
+openai_ef = CachedOpenAIEmbeddingFunction(
     model_name="text-embedding-3-small",
     api_key=os.getenv("OPENAI_API_KEY"),
+    cache=embedding_cache,
 )
@@ -0,0 +1,141 @@
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
+from redis.exceptions import RedisError
+
+from core.redis_client import redis_client
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed on (model name, normalized text); texts
+    differing only in Unicode form or whitespace share an entry.
+    The first tier is a bounded in-process LRU, the second is Redis so
+    embeddings survive restarts and are shared between web and huey workers.
+    Redis failures degrade to a cache miss instead of failing the request.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl: int = 60 * 60 * 24 * 30,
+        redis=redis_client,
+        # v2: values are embeddings of the original, not the normalized, text
+        prefix: str = "embedding:v2",
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis = redis
+        self.prefix = prefix
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def key(self, text: str, model_name: str) -> str:
+        text = normalize_text(text)
+        digest = hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{model_name}:{digest}"
+
+    def _remember(self, key: str, embedding: np.ndarray) -> None:
+        with self._lock:
+            self._memory[key] = embedding
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get_many(self, texts: list[str], model_name: str) -> list[np.ndarray | None]:
+        keys = [self.key(text, model_name) for text in texts]
+        found: list[np.ndarray | None] = [None] * len(keys)
+
+        with self._lock:
+            for idx, key in enumerate(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[idx] = self._memory[key]
+                    self.memory_hits += 1
+
+        pending = [idx for idx, embedding in enumerate(found) if embedding is None]
+        if pending:
+            try:
+                values = self.redis.mget([keys[idx] for idx in pending])
+            except RedisError as e:
+                print(f"Embedding cache unavailable, skipping persistent tier: {e}")
+                values = [None] * len(pending)
+
+            for idx, value in zip(pending, values):
+                if value is None:
+                    self.misses += 1
+                    continue
+                embedding = np.frombuffer(value, dtype=np.float32)
+                found[idx] = embedding
+                self.persistent_hits += 1
+                self._remember(keys[idx], embedding)
+
+        return found
+
+    def set_many(
+        self, texts: list[str], embeddings: list[np.ndarray], model_name: str
+    ) -> None:
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for text, embedding in zip(texts, embeddings):
+                key = self.key(text, model_name)
+                embedding = np.asarray(embedding, dtype=np.float32)
+                self._remember(key, embedding)
+                pipe.set(key, embedding.tobytes(), ex=self.ttl)
+            pipe.execute()
+        except RedisError as e:
+            print(f"Embedding cache unavailable, not persisting embeddings: {e}")
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+class CachedOpenAIEmbeddingFunction(OpenAIEmbeddingFunction):
+    """
+    OpenAIEmbeddingFunction that only sends texts missing from the
+    EmbeddingCache to the API. Used for both Chroma ingestion and queries.
+    Texts are embedded as given; normalization only applies to cache keys.
+    """
+
+    def __init__(self, *args, cache: EmbeddingCache, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+
+    def __call__(self, input):
+        texts = list(input)
+        embeddings = self.cache.get_many(texts, self.model_name)
+
+        # One API input per cache key, embedded from its first original text
+        missing = {}
+        for text, embedding in zip(texts, embeddings):
+            if embedding is None:
+                missing.setdefault(self.cache.key(text, self.model_name), text)
+        if missing:
+            originals = list(missing.values())
+            fresh = dict(zip(missing, super().__call__(originals)))
+            self.cache.set_many(originals, list(fresh.values()), self.model_name)
+            embeddings = [
+                fresh[self.cache.key(text, self.model_name)] if emb is None else emb
+                for text, emb in zip(texts, embeddings)
+            ]
+
+        return embeddings
@@ -0,0 +1,202 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Callable, Iterable
+
+import tiktoken
+from django.conf import settings
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from core.ai.chroma import chroma, openai_ef
+
+# OpenAI embedding limits: tokens per input, inputs and tokens per request
+MAX_INPUT_TOKENS = 8191
+MAX_BATCH_INPUTS = 2048
+MAX_BATCH_TOKENS = 300_000
+
+# Errors worth retrying; anything else (bad input, auth) fails immediately
+TRANSIENT_ERRORS = (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+
+# (id, text, metadata)
+Chunk = tuple[str, str, dict]
+
+
+class RateLimiter:
+    """
+    Spaces out requests so that neither requests_per_minute nor
+    tokens_per_minute is exceeded. Thread-safe; callers block in
+    `acquire` until their request may start.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.request_interval = 60.0 / requests_per_minute
+        self.token_interval = 60.0 / tokens_per_minute
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + max(
+                self.request_interval, tokens * self.token_interval
+            )
+        if start > now:
+            time.sleep(start - now)
+
+
+@lru_cache
+def _encoding(model_name: str):
+    return tiktoken.encoding_for_model(model_name)
+
+
+def token_batches(
+    chunks: Iterable[Chunk],
+    encoding,
+    max_tokens: int = MAX_BATCH_TOKENS,
+    max_inputs: int = MAX_BATCH_INPUTS,
+):
+    """
+    Groups chunks into batches of at most max_tokens tokens and max_inputs
+    chunks, consuming `chunks` lazily. Yields (batch, texts to embed,
+    token count); texts above MAX_INPUT_TOKENS are truncated for embedding
+    only, the stored document stays complete.
+    """
+    batch: list[Chunk] = []
+    texts: list[str] = []
+    batch_tokens = 0
+    for chunk in chunks:
+        tokens = encoding.encode(chunk[1], disallowed_special=())
+        if len(tokens) > MAX_INPUT_TOKENS:
+            print(
+                f"⚠️ Chunk '{chunk[0]}' has {len(tokens)} tokens, "
+                f"embedding its first {MAX_INPUT_TOKENS}."
+            )
+            tokens = tokens[:MAX_INPUT_TOKENS]
+            text = encoding.decode(tokens)
+        else:
+            text = chunk[1]
+
+        if batch and (
+            batch_tokens + len(tokens) > max_tokens or len(batch) >= max_inputs
+        ):
+            yield batch, texts, batch_tokens
+            batch, texts, batch_tokens = [], [], 0
+        batch.append(chunk)
+        texts.append(text)
+        batch_tokens += len(tokens)
+
+    if batch:
+        yield batch, texts, batch_tokens
+
+
+def ingest_chunks(
+    collection,
+    chunks: Iterable[Chunk],
+    embedding_function=openai_ef,
+    batch_tokens: int | None = None,
+    workers: int | None = None,
+    rate_limiter: RateLimiter | None = None,
+    progress: Callable[[int, int | None], None] | None = None,
+    total: int | None = None,
+    write_size: int | None = None,
+) -> dict:
+    """
+    Embeds and upserts `chunks` into a Chroma collection.
+
+    Chunks are streamed into token-bounded batches that are embedded
+    concurrently by `workers` threads, each request paced by the rate
+    limiter and retried with exponential backoff on transient API errors.
+    Embedded chunks are written to the collection in bulk, `write_size`
+    rows per upsert (default: the Chroma server's maximum batch size).
+    Only a few batches are in flight at once, so arbitrarily large inputs
+    are processed in bounded memory.
+
+    `progress(embedded, total)` is called as batches finish; pass `total`
+    if `chunks` is a generator of known length. Returns ingestion stats.
+    """
+    batch_tokens = batch_tokens or settings.EMBEDDING_BATCH_TOKENS
+    workers = workers or settings.EMBEDDING_WORKERS
+    if rate_limiter is None:
+        rate_limiter = RateLimiter(
+            settings.EMBEDDING_REQUESTS_PER_MINUTE,
+            settings.EMBEDDING_TOKENS_PER_MINUTE,
+        )
+    if total is None and hasattr(chunks, "__len__"):
+        total = len(chunks)
+    encoding = _encoding(embedding_function.model_name)
+    write_size = write_size or chroma.get_max_batch_size()
+
+    @retry(
+        retry=retry_if_exception_type(TRANSIENT_ERRORS),
+        wait=wait_random_exponential(multiplier=1, max=60),
+        stop=stop_after_attempt(6),
+        reraise=True,
+    )
+    def embed(texts: list[str], tokens: int):
+        rate_limiter.acquire(tokens)
+        return embedding_function(texts)
+
+    def embed_batch(batch: list[Chunk], texts: list[str], tokens: int):
+        return batch, tokens, embed(texts, tokens)
+
+    stats = {"chunks": 0, "batches": 0, "tokens": 0, "writes": 0}
+    embedded = 0
+    pending_write: list[tuple[Chunk, object]] = []
+
+    def write(flush: bool = False) -> None:
+        while pending_write and (flush or len(pending_write) >= write_size):
+            rows = pending_write[:write_size]
+            del pending_write[:write_size]
+            collection.upsert(
+                ids=[chunk[0] for chunk, _ in rows],
+                embeddings=[embedding for _, embedding in rows],
+                documents=[chunk[1] for chunk, _ in rows],
+                metadatas=[chunk[2] for chunk, _ in rows],
+            )
+            stats["chunks"] += len(rows)
+            stats["writes"] += 1
+
+    def collect(done) -> None:
+        nonlocal embedded
+        for future in done:
+            batch, tokens, embeddings = future.result()
+            pending_write.extend(zip(batch, embeddings))
+            embedded += len(batch)
+            stats["batches"] += 1
+            stats["tokens"] += tokens
+            if progress:
+                progress(embedded, total)
+        write()
+
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="embedding"
+    ) as executor:
+        in_flight = set()
+        for batch, texts, tokens in token_batches(chunks, encoding, batch_tokens):
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(executor.submit(embed_batch, batch, texts, tokens))
+
+        done, _ = wait(in_flight)
+        collect(done)
+    write(flush=True)
+    return stats
@@ -1,13 +1,31 @@
-import json
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from core.serialization import loads
 
 load_dotenv()
 
 GEMINI_API_KEY  = os.getenv("GEMINI_API_KEY")
 OPENAI_API_KEY  = os.getenv("OPENAI_API_KEY")
 
+# Async clients for the ASGI chat path, one per provider for the whole
+# process so their connection pools are reused across turns
+_async_clients: dict[str, AsyncOpenAI] = {}
+
+
+def _async_client(provider: str) -> AsyncOpenAI:
+    if provider not in _async_clients:
+        if provider == "gemini":
+            _async_clients[provider] = AsyncOpenAI(
+                api_key=GEMINI_API_KEY,
+                base_url="https://generativelanguage.googleapis.com/v1beta/openai/"
+            )
+        else:
+            _async_clients[provider] = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    return _async_clients[provider]
+
+
 class PromptManager:
     def __init__(
         self,
@@ -35,6 +53,9 @@ class PromptManager:
             else self.openai_client
         )
 
+    def _choose_async_client(self, model: str) -> AsyncOpenAI:
+        return _async_client("gemini" if model.lower().startswith("gemini") else "openai")
+
     def generate(self, model: str | None = None) -> str:
         model_to_use = model or self.default_model
         client = self._choose_client(model_to_use)
@@ -55,4 +76,18 @@ class PromptManager:
             response_format=schema,
         )
         content = resp.choices[0].message.model_dump()["content"]
-        return json.loads(content)
\ No newline at end of file
+        return loads(content)
+
+    async def astream(self, model: str | None = None):
+        """Yields the completion text as it is generated."""
+        model_to_use = model or self.default_model
+        client = self._choose_async_client(model_to_use)
+        stream = await client.chat.completions.create(
+            model=model_to_use,
+            messages=self.messages,
+            reasoning_effort="medium",
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
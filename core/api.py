@@ -0,0 +1,16 @@
+from django.views import View
+
+from core.ai.chroma import embedding_cache
+from core.queues import queue_metrics
+from core.serialization import OrjsonResponse
+
+
+class MetricsAPI(View):
+    def get(self, request, *args, **kwargs):
+        return OrjsonResponse(
+            {
+                "queues": queue_metrics(),
+                # Per web process; huey workers keep their own counters
+                "embedding_cache": embedding_cache.stats(),
+            }
+        )
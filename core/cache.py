@@ -0,0 +1,230 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache, RedisSerializer
+from django.db import transaction
+from redis.exceptions import RedisError
+
+from core.redis_client import async_redis_client
+
+# Default lifetime of cached reads; invalidation normally comes first
+CACHE_TIMEOUT = 60 * 5
+# Namespace versions outlive every entry keyed by them; losing one is a miss
+NAMESPACE_TIMEOUT = CACHE_TIMEOUT * 12
+# How long a recompute may hold the stampede lock
+LOCK_TIMEOUT = 30
+# How long other readers wait for the lock holder before computing anyway
+LOCK_WAIT = 5.0
+LOCK_POLL_INTERVAL = 0.05
+
+# Distinguishes a cached None from a miss
+_MISSING = object()
+
+
+def _namespace_key(namespace: str) -> str:
+    return f"ns:{namespace}"
+
+
+def namespace_version(namespace: str) -> int:
+    version = cache.get(_namespace_key(namespace))
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(_namespace_key(namespace), version, NAMESPACE_TIMEOUT):
+            version = cache.get(_namespace_key(namespace), version)
+    return version
+
+
+def cache_key(namespace: str, *parts) -> str:
+    """
+    Key inside a namespace. Bumping the namespace version orphans every
+    key of the previous version at once, so related reads (status, report
+    views, listing pages) never need to be enumerated to be invalidated.
+    """
+    suffix = ":".join(str(part) for part in parts)
+    return f"{namespace}:{namespace_version(namespace)}:{suffix}"
+
+
+def invalidate(*namespaces: str) -> None:
+    """Bumps namespaces once the current transaction commits."""
+
+    def bump():
+        try:
+            # A fresh timestamp never collides with an evicted older version
+            cache.set_many(
+                {_namespace_key(namespace): time.time_ns() for namespace in namespaces},
+                NAMESPACE_TIMEOUT,
+            )
+        except RedisError as e:
+            print(f"Could not invalidate cache namespaces {namespaces}: {e}")
+
+    transaction.on_commit(bump)
+
+
+def _lookup(namespace: str, parts):
+    key = cache_key(namespace, *parts)
+    return key, cache.get(key, _MISSING)
+
+
+def cached(namespace: str, parts, producer, timeout=CACHE_TIMEOUT):
+    """
+    Returns the cached value of `producer()` for the key, computing it on a
+    miss. Only one caller recomputes a missing key at a time; concurrent
+    callers wait briefly for its result instead of all hitting the
+    database. Falls back to calling `producer` if Redis is unavailable.
+    """
+    try:
+        key, value = _lookup(namespace, parts)
+    except RedisError as e:
+        print(f"Cache unavailable for {namespace}: {e}")
+        return producer()
+    if value is not _MISSING:
+        return value
+
+    lock_key = f"lock:{key}"
+    try:
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                value = cache.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+            return producer()
+    except RedisError:
+        return producer()
+
+    try:
+        value = producer()
+        try:
+            cache.set(key, value, timeout)
+        except RedisError:
+            pass
+    finally:
+        try:
+            cache.delete(lock_key)
+        except RedisError:
+            pass
+    return value
+
+
+# Async variants for async views. With the Redis backend they use the
+# asyncio Redis client, in the same key and value format as the sync
+# functions so both share entries; Django's own async cache methods run
+# each call in the single thread-sensitive executor instead.
+
+_serializer = RedisSerializer()
+
+
+def _native_async() -> bool:
+    return isinstance(caches["default"], RedisCache)
+
+
+async def _aget(key: str, default=None):
+    if not _native_async():
+        return await cache.aget(key, default)
+    value = await async_redis_client.get(cache.make_and_validate_key(key))
+    return default if value is None else _serializer.loads(value)
+
+
+async def _aadd(key: str, value, timeout) -> bool:
+    if not _native_async():
+        return await cache.aadd(key, value, timeout)
+    return bool(
+        await async_redis_client.set(
+            cache.make_and_validate_key(key),
+            _serializer.dumps(value),
+            ex=cache.get_backend_timeout(timeout),
+            nx=True,
+        )
+    )
+
+
+async def _aset(key: str, value, timeout) -> None:
+    if not _native_async():
+        await cache.aset(key, value, timeout)
+        return
+    await async_redis_client.set(
+        cache.make_and_validate_key(key),
+        _serializer.dumps(value),
+        ex=cache.get_backend_timeout(timeout),
+    )
+
+
+async def _adelete(key: str) -> None:
+    if not _native_async():
+        await cache.adelete(key)
+        return
+    await async_redis_client.delete(cache.make_and_validate_key(key))
+
+
+async def anamespace_version(namespace: str) -> int:
+    version = await _aget(_namespace_key(namespace))
+    if version is None:
+        version = time.time_ns()
+        if not await _aadd(_namespace_key(namespace), version, NAMESPACE_TIMEOUT):
+            version = await _aget(_namespace_key(namespace), version)
+    return version
+
+
+async def acache_key(namespace: str, *parts) -> str:
+    suffix = ":".join(str(part) for part in parts)
+    return f"{namespace}:{await anamespace_version(namespace)}:{suffix}"
+
+
+async def _alookup(namespace: str, parts):
+    if not _native_async():
+        # One executor hop for the namespace version and the value
+        return await sync_to_async(_lookup)(namespace, parts)
+    key = await acache_key(namespace, *parts)
+    return key, await _aget(key, _MISSING)
+
+
+async def acached(namespace: str, parts, producer, timeout=CACHE_TIMEOUT):
+    """Async `cached`; `producer` is a coroutine function."""
+    try:
+        key, value = await _alookup(namespace, parts)
+    except RedisError as e:
+        print(f"Cache unavailable for {namespace}: {e}")
+        return await producer()
+    if value is not _MISSING:
+        return value
+
+    lock_key = f"lock:{key}"
+    try:
+        if not await _aadd(lock_key, 1, LOCK_TIMEOUT):
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+                value = await _aget(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+            return await producer()
+    except RedisError:
+        return await producer()
+
+    try:
+        value = await producer()
+        try:
+            await _aset(key, value, timeout)
+        except RedisError:
+            pass
+    finally:
+        try:
+            await _adelete(lock_key)
+        except RedisError:
+            pass
+    return value
+
+
+def contract_namespace(contract_id) -> str:
+    return f"contract:{contract_id}"
+
+
+def contract_list_namespace(user_id=None) -> str:
+    return f"contracts:user:{user_id}" if user_id else "contracts:unowned"
+
+
+def chat_namespace(contract_id) -> str:
+    return f"chats:{contract_id}"
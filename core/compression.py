@@ -0,0 +1,63 @@
+import gzip
+
+import zstandard
+
+ENCODING_IDENTITY = "identity"
+ENCODING_GZIP = "gzip"
+ENCODING_ZSTD = "zstd"
+
+# Precomputed artifacts are compressed once, so favour size over speed
+ARTIFACT_GZIP_LEVEL = 9
+ARTIFACT_ZSTD_LEVEL = 19
+# Per-message compression has to keep up with live traffic
+FRAME_GZIP_LEVEL = 6
+
+
+def compress(data: bytes, encoding: str, level: int | None = None) -> bytes:
+    if encoding == ENCODING_GZIP:
+        return gzip.compress(data, compresslevel=level or ARTIFACT_GZIP_LEVEL)
+    if encoding == ENCODING_ZSTD:
+        return zstandard.ZstdCompressor(level=level or ARTIFACT_ZSTD_LEVEL).compress(
+            data
+        )
+    return data
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == ENCODING_GZIP:
+        return gzip.decompress(data)
+    if encoding == ENCODING_ZSTD:
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Maps each coding of an Accept-Encoding header to its q-value."""
+    codings = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+def negotiate_encoding(header: str, available) -> str:
+    """
+    Best of `available` (in server preference order) acceptable to the
+    client, falling back to identity.
+    """
+    codings = parse_accept_encoding(header or "")
+    best, best_q = ENCODING_IDENTITY, 0.0
+    for encoding in available:
+        q = codings.get(encoding, codings.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
@@ -1,52 +1,171 @@
 import asyncio
-import json
+import uuid
+from urllib.parse import parse_qs
 
-from channels.db import database_sync_to_async
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
-
+from django.db import close_old_connections
+from django.db.models import Q
+
+from chats.jobs import (
+    SOCKET_HEARTBEAT,
+    cancel_chats,
+    claim_chat,
+    socket_alive,
+    socket_disconnected,
+)
 from chats.models import Chat
-from chats.tasks import process_chat
-
+from chats.executor import submit_chat
+from core.events import (
+    EVENT_CHANNEL_CHAT,
+    EVENT_CHANNEL_NOTIFICATION,
+    read_events_since,
+)
+from core.methods import notification_groups
+from core.serialization import FrameSenderMixin, loads
+from documents.models import Contract
+
+
+class NotificationConsumer(FrameSenderMixin, AsyncWebsocketConsumer):
+    """
+    Subscribes to the notifications of specific contracts, taken from the
+    URL (/ws/notifications/<contract_id>/) or a `contract_id` query
+    parameter (comma separated), and of the authenticated user if any.
+    Contract events newer than a `last_event_id` query parameter are
+    replayed on connect.
+
+    Only contracts the user may see are subscribed: their own, or unowned
+    ones uploaded anonymously. Other contract ids are ignored.
+    """
 
-class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
+        contract_ids = []
+        if contract_id := self.scope["url_route"]["kwargs"].get("contract_id"):
+            contract_ids.append(contract_id)
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        for value in query.get("contract_id", []):
+            contract_ids.extend(cid for cid in value.split(",") if cid)
+
+        user = self.scope.get("user")
+        user_id = user.id if user and user.is_authenticated else None
+        contract_ids = await self.visible_contracts(contract_ids, user_id)
+
+        self.groups_joined = [
+            group
+            for contract_id in contract_ids
+            for group in notification_groups(contract_id=contract_id)
+        ]
+        if user_id:
+            self.groups_joined += notification_groups(user_id=user_id)
+
         await self.accept()
-        await self.channel_layer.group_add("notification", self.channel_name)
+        for group in self.groups_joined:
+            await self.channel_layer.group_add(group, self.channel_name)
+
+        if last_event_id := query.get("last_event_id", [None])[0]:
+            missed = []
+            for contract_id in contract_ids:
+                for event_id, message in await read_events_since(
+                    contract_id, EVENT_CHANNEL_NOTIFICATION, last_event_id
+                ):
+                    missed.append({**message, "id": event_id})
+            if missed:
+                await self.send_notification_batch({"messages": missed})
+
+    async def visible_contracts(self, contract_ids, user_id) -> list[str]:
+        valid_ids = []
+        for contract_id in contract_ids:
+            try:
+                valid_ids.append(uuid.UUID(str(contract_id)))
+            except ValueError:
+                continue
+        if not valid_ids:
+            return []
+
+        owner = Q(user__isnull=True)
+        if user_id:
+            owner |= Q(user_id=user_id)
+        visible = [
+            str(contract_id)
+            async for contract_id in Contract.objects.filter(
+                owner, id__in=valid_ids
+            ).values_list("id", flat=True)
+        ]
+        await sync_to_async(close_old_connections)()
+        return visible
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard("notification", self.channel_name)
+        for group in self.groups_joined:
+            await self.channel_layer.group_discard(group, self.channel_name)
 
     async def send_notification(self, event):
-        message = event["message"]
-        await self.send(text_data=json.dumps({"message": message}))
+        await self.send_frame(event.get("frame") or {"message": event["message"]})
 
+    async def send_notification_batch(self, event):
+        await self.send_frame(event.get("frame") or {"messages": event["messages"]})
 
-class ChatConsumer(AsyncWebsocketConsumer):
+
+class ChatConsumer(FrameSenderMixin, AsyncWebsocketConsumer):
     async def connect(self):
         self.contract_id = self.scope["url_route"]["kwargs"]["contract_id"]
         self.group_name = f"chat_{self.contract_id}"
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
+        await socket_alive(self.contract_id, self.channel_name)
+        self.heartbeat = asyncio.create_task(self.keep_alive())
+
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        if last_event_id := query.get("last_event_id", [None])[0]:
+            for event_id, event in await read_events_since(
+                self.contract_id, EVENT_CHANNEL_CHAT, last_event_id
+            ):
+                await self.send_message({**event, "id": event_id})
 
     async def disconnect(self, close_code):
+        if heartbeat := getattr(self, "heartbeat", None):
+            heartbeat.cancel()
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        await socket_disconnected(self.contract_id, self.channel_name)
+
+    async def keep_alive(self):
+        while True:
+            await asyncio.sleep(SOCKET_HEARTBEAT)
+            await socket_alive(self.contract_id, self.channel_name)
 
     async def receive(self, text_data):
-        data = json.loads(text_data)
+        data = loads(text_data)
+
+        # {"action": "cancel"} drops queued/running turns; {"replace": true}
+        # does the same before submitting the new message
+        if data.get("action") == "cancel" or data.get("replace"):
+            await cancel_chats(self.contract_id)
+
         msg = data.get("message")
         if not msg:
             return
-        process_chat(msg, self.contract_id)
+
+        epoch = await claim_chat(self.contract_id, msg)
+        if epoch is None:
+            # The same question is already being answered
+            return
+        await submit_chat(msg, self.contract_id, epoch)
 
     async def send_message(self, event):
         # Kirim pesan assistant ke client
-        await self.send(
-            text_data=json.dumps(
-                {
-                    "message": event["message"],
-                    "sender": event.get("sender", "assistant"),
-                }
-            )
+        await self.send_frame(
+            event.get("frame")
+            or {
+                "message": event["message"],
+                "sender": event.get("sender", "assistant"),
+                "id": event.get("id"),
+            }
+        )
+
+    async def send_message_delta(self, event):
+        # Partial assistant answer streamed by the async chat executor
+        await self.send_frame(
+            event.get("frame")
+            or {"delta": event["delta"], "sender": event.get("sender", "assistant")}
         )
 
     async def poll_assistant_reply(self):
@@ -57,29 +176,24 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
             latest = await self.get_latest_assistant()
             if latest and latest.id != last_seen_id:
-                await self.send(
-                    text_data=json.dumps(
-                        {
-                            "message": latest.message,
-                            "sender": "assistant",
-                        }
-                    )
+                await self.send_frame(
+                    {
+                        "message": latest.message,
+                        "sender": "assistant",
+                    }
                 )
                 last_seen_id = latest.id
 
-    @database_sync_to_async
-    def get_latest_assistant(self):
-        return (
-            Chat.objects.filter(contract_id=self.contract_id, role="assistant")
-            .order_by("-created_at")
-            .first()
-        )
-
-    @database_sync_to_async
-    def get_last_assistant_id(self):
+    async def get_latest_assistant(self):
         latest = (
-            Chat.objects.filter(contract_id=self.contract_id, role="assistant")
+            await Chat.objects.filter(contract_id=self.contract_id, role="assistant")
             .order_by("-created_at")
-            .first()
+            .afirst()
         )
+        # Long-lived consumers return the pooled connection after each use
+        await sync_to_async(close_old_connections)()
+        return latest
+
+    async def get_last_assistant_id(self):
+        latest = await self.get_latest_assistant()
         return latest.id if latest else None
@@ -0,0 +1,118 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from redis.exceptions import RedisError
+
+from core.redis_client import async_redis_client, redis_client
+from core.serialization import dumps, loads
+
+# Entries kept per contract stream (approximate trimming)
+EVENT_STREAM_MAXLEN = 500
+# Streams of idle contracts expire after a day
+EVENT_STREAM_TTL = 60 * 60 * 24
+
+EVENT_CHANNEL_NOTIFICATION = "notification"
+EVENT_CHANNEL_CHAT = "chat"
+
+# Wait between database re-reads when pub/sub is unavailable
+STATUS_POLL_FALLBACK = 1.0
+
+
+def event_stream_key(contract_id) -> str:
+    return f"events:contract:{contract_id}"
+
+
+def append_events(contract_id, channel: str, payloads: list[dict]) -> list[str | None]:
+    """
+    Appends events to the bounded Redis stream of a contract and returns
+    their stream IDs, which clients echo back as `last_event_id` when they
+    reconnect. If Redis is unavailable the events are still delivered live,
+    just without an ID.
+    """
+    key = event_stream_key(contract_id)
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for payload in payloads:
+            pipe.xadd(
+                key,
+                {"channel": channel, "data": dumps(payload)},
+                maxlen=EVENT_STREAM_MAXLEN,
+                approximate=True,
+            )
+        pipe.expire(key, EVENT_STREAM_TTL)
+        ids = pipe.execute()[:-1]
+    except RedisError as e:
+        print(f"Could not append events for contract {contract_id}: {e}")
+        return [None] * len(payloads)
+    return [event_id.decode() for event_id in ids]
+
+
+async def read_events_since(contract_id, channel: str, last_event_id: str) -> list:
+    """Returns (event_id, payload) pairs of `channel` newer than last_event_id."""
+    try:
+        entries = await async_redis_client.xrange(
+            event_stream_key(contract_id), min=f"({last_event_id}", max="+"
+        )
+    except RedisError as e:
+        print(f"Could not replay events for contract {contract_id}: {e}")
+        return []
+
+    return [
+        (event_id.decode(), loads(fields[b"data"]))
+        for event_id, fields in entries
+        if fields.get(b"channel", b"").decode() == channel
+    ]
+
+
+def status_channel(contract_id) -> str:
+    return f"status:contract:{contract_id}"
+
+
+def publish_status(contract_id, status: str) -> None:
+    """Wakes long-polling status requests of a contract."""
+    try:
+        redis_client.publish(status_channel(contract_id), status)
+    except RedisError as e:
+        print(f"Could not publish status for contract {contract_id}: {e}")
+
+
+@asynccontextmanager
+async def status_subscription(contract_id):
+    """
+    Subscribes to the status channel of a contract and yields
+    `wait(timeout)`, which returns once a change is published or the
+    timeout passes. Subscribe before reading the current state so no change
+    is missed in between. Without Redis, `wait` just sleeps briefly and the
+    caller re-reads the database.
+    """
+    pubsub = async_redis_client.pubsub()
+    try:
+        await pubsub.subscribe(status_channel(contract_id))
+        subscribed = True
+    except RedisError as e:
+        print(f"Could not subscribe to status of contract {contract_id}: {e}")
+        subscribed = False
+
+    async def wait(timeout: float) -> None:
+        if not subscribed:
+            await asyncio.sleep(min(timeout, STATUS_POLL_FALLBACK))
+            return
+        deadline = asyncio.get_running_loop().time() + timeout
+        while (remaining := deadline - asyncio.get_running_loop().time()) > 0:
+            try:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=remaining
+                )
+            except RedisError:
+                await asyncio.sleep(min(remaining, STATUS_POLL_FALLBACK))
+                return
+            if message is not None:
+                return
+
+    try:
+        yield wait
+    finally:
+        try:
+            await pubsub.aclose()
+        except RedisError:
+            pass
@@ -0,0 +1,130 @@
+import asyncio
+import statistics
+import time
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Load-tests running API endpoints and reports throughput and latency,
+    e.g. before and after a change to the views:
+
+    python manage.py benchmark_api http://localhost:8000/api/v1/contracts
+    python manage.py benchmark_api URL [URL ...] -n 5000 -c 100
+    """
+
+    help = "Measure requests per second of API endpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+")
+        parser.add_argument("-n", "--requests", type=int, default=1000)
+        parser.add_argument("-c", "--concurrency", type=int, default=50)
+        parser.add_argument(
+            "-m",
+            "--method",
+            default="GET",
+            help="HTTP method; POST requests send --file as multipart",
+        )
+        parser.add_argument("-f", "--file", help="File uploaded by POST requests")
+        parser.add_argument("--warmup", type=int, default=50)
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be positive")
+
+        upload = None
+        if options["method"].upper() == "POST" and options["file"]:
+            try:
+                with open(options["file"], "rb") as f:
+                    upload = (options["file"].rsplit("/", 1)[-1], f.read())
+            except OSError as e:
+                raise CommandError(f"Could not read {options['file']}: {e}")
+
+        for url in options["urls"]:
+            result = asyncio.run(self._run(url, upload, options))
+            self._report(url, result, options)
+
+    async def _run(self, url, upload, options) -> dict:
+        method = options["method"].upper()
+        limits = httpx.Limits(
+            max_connections=options["concurrency"],
+            max_keepalive_connections=options["concurrency"],
+        )
+        latencies: list[float] = []
+        statuses: dict[int, int] = {}
+        errors = 0
+
+        async with httpx.AsyncClient(
+            limits=limits, timeout=options["timeout"]
+        ) as client:
+
+            async def send():
+                files = {"file": upload} if upload else None
+                return await client.request(method, url, files=files)
+
+            for _ in range(options["warmup"]):
+                try:
+                    await send()
+                except httpx.HTTPError:
+                    pass
+
+            remaining = options["requests"]
+
+            async def worker():
+                nonlocal remaining, errors
+                while remaining > 0:
+                    remaining -= 1
+                    start = time.perf_counter()
+                    try:
+                        response = await send()
+                    except httpx.HTTPError:
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - start)
+                    statuses[response.status_code] = (
+                        statuses.get(response.status_code, 0) + 1
+                    )
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(options["concurrency"])))
+            elapsed = time.perf_counter() - started
+
+        return {
+            "elapsed": elapsed,
+            "latencies": latencies,
+            "statuses": statuses,
+            "errors": errors,
+        }
+
+    def _report(self, url, result, options) -> None:
+        latencies = sorted(result["latencies"])
+        completed = len(latencies)
+        self.stdout.write(self.style.MIGRATE_HEADING(url))
+        self.stdout.write(
+            f"  {completed} requests, concurrency {options['concurrency']}, "
+            f"{result['elapsed']:.2f}s"
+        )
+        if not completed:
+            self.stdout.write(self.style.ERROR(f"  all {result['errors']} failed"))
+            return
+
+        def percentile(p):
+            return latencies[min(completed - 1, int(completed * p))] * 1000
+
+        self.stdout.write(
+            self.style.SUCCESS(f"  {completed / result['elapsed']:.1f} requests/sec")
+        )
+        self.stdout.write(
+            f"  latency ms: mean {statistics.mean(latencies) * 1000:.1f}, "
+            f"p50 {percentile(0.5):.1f}, p95 {percentile(0.95):.1f}, "
+            f"p99 {percentile(0.99):.1f}"
+        )
+        statuses = ", ".join(
+            f"{status}: {count}" for status, count in sorted(result["statuses"].items())
+        )
+        self.stdout.write(f"  status codes: {statuses}")
+        if result["errors"]:
+            self.stdout.write(self.style.WARNING(f"  errors: {result['errors']}"))
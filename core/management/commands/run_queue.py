@@ -0,0 +1,48 @@
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import autodiscover_modules
+from huey.consumer_options import ConsumerConfig
+
+
+class Command(BaseCommand):
+    """
+    Runs the worker pool of one named queue from settings.HUEY_QUEUES, e.g.
+
+    python manage.py run_queue chat
+    python manage.py run_queue contracts --workers 4
+    """
+
+    help = "Run the consumer of a named task queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument("queue", choices=sorted(settings.HUEY_QUEUES))
+        parser.add_argument("-w", "--workers", type=int)
+        parser.add_argument("-k", "--worker-type", dest="worker_type")
+
+    def handle(self, *args, **options):
+        from core.queues import QUEUES
+
+        queue = QUEUES[options["queue"]]
+        if queue.immediate:
+            raise CommandError(
+                f"Queue '{options['queue']}' runs in immediate mode (HUEY_IMMEDIATE)"
+            )
+
+        consumer_options = dict(
+            settings.HUEY_QUEUES[options["queue"]].get("consumer", {})
+        )
+        for key in ("workers", "worker_type"):
+            if options.get(key) is not None:
+                consumer_options[key] = options[key]
+
+        autodiscover_modules("tasks")
+
+        config = ConsumerConfig(**consumer_options)
+        config.validate()
+        logger = logging.getLogger("huey")
+        if not logger.handlers:
+            config.setup_logger(logger)
+
+        queue.create_consumer(**config.values).run()
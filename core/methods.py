@@ -1,25 +1,124 @@
+import threading
+import time
+
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 
+from core.events import EVENT_CHANNEL_CHAT, EVENT_CHANNEL_NOTIFICATION, append_events
+from core.serialization import encode_frame
+
+NOTIFICATION_GROUP = "notification"
+
 
-def send_notification(notification_type, content):
+def notification_groups(contract_id=None, user_id=None) -> list[str]:
+    """
+    Channel groups a notification is delivered to. Unscoped notifications
+    fall back to the legacy global group.
+    """
+    groups = []
+    if contract_id:
+        groups.append(f"notification_contract_{contract_id}")
+    if user_id:
+        groups.append(f"notification_user_{user_id}")
+    return groups or [NOTIFICATION_GROUP]
+
+
+def send_notification(notification_type, content, contract_id=None, user_id=None):
     channel = get_channel_layer()
-    async_to_sync(channel.group_send)(
-        "notification",
-        {
-            "type": "send_notification",
-            "message": {"type": notification_type, "content": content},
-        },
-    )
+    frame = encode_frame({"message": {"type": notification_type, "content": content}})
+    for group in notification_groups(contract_id, user_id):
+        async_to_sync(channel.group_send)(
+            group, {"type": "send_notification", "frame": frame}
+        )
+
+
+class ProgressNotifier:
+    """
+    Coalesces and rate-limits progress notifications of a single job.
+
+    The first event after a quiet period is sent immediately; events arriving
+    within `interval` seconds of the last frame are buffered and delivered
+    together as one batch frame when the interval elapses. Final events
+    flush the buffer immediately.
+
+    Contract-scoped events are also appended to the contract's event stream
+    so reconnecting clients can replay what they missed.
+    """
+
+    def __init__(self, contract_id=None, user_id=None, interval: float = 0.5):
+        self.contract_id = contract_id
+        self.groups = notification_groups(contract_id, user_id)
+        self.interval = interval
+        self._buffer: list[dict] = []
+        self._last_sent = 0.0
+        self._timer: threading.Timer | None = None
+        self._lock = threading.Lock()
+
+    def notify(self, notification_type, content, final: bool = False) -> None:
+        with self._lock:
+            self._buffer.append({"type": notification_type, "content": content})
+            wait = self._last_sent + self.interval - time.monotonic()
+            if final or wait <= 0:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(wait, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        self.flush()
+
+    def _flush_locked(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+
+        messages, self._buffer = self._buffer, []
+        if self.contract_id:
+            ids = append_events(self.contract_id, EVENT_CHANNEL_NOTIFICATION, messages)
+            for message, event_id in zip(messages, ids):
+                message["id"] = event_id
+
+        if len(messages) == 1:
+            event = {
+                "type": "send_notification",
+                "frame": encode_frame({"message": messages[0]}),
+            }
+        else:
+            event = {
+                "type": "send_notification_batch",
+                "frame": encode_frame({"messages": messages}),
+            }
+
+        channel = get_channel_layer()
+        for group in self.groups:
+            async_to_sync(channel.group_send)(group, event)
+        self._last_sent = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 def send_chat_message(message, contract_id):
+    (event_id,) = append_events(
+        contract_id, EVENT_CHANNEL_CHAT, [{"message": message, "sender": "assistant"}]
+    )
     channel_layer = get_channel_layer()
     async_to_sync(channel_layer.group_send)(
         f"chat_{contract_id}",
         {
             "type": "send_message",
-            "message": message,
-            "sender": "assistant",
+            "frame": encode_frame(
+                {"message": message, "sender": "assistant", "id": event_id}
+            ),
         },
     )
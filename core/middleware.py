@@ -0,0 +1,85 @@
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# Stats of the request being handled; context variables follow the request
+# into sync_to_async threads, so async views are counted too
+_request_queries: ContextVar[QueryStats | None] = ContextVar(
+    "request_queries", default=None
+)
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _request_queries.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.duration += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Counts the database queries of each request and their total duration,
+    exposed as X-DB-Queries / X-DB-Time-Ms headers. Requests above
+    QUERY_COUNT_WARNING queries are reported as likely N+1 regressions.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        token = _request_queries.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        return self._report(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        token = _request_queries.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        return self._report(request, response, stats)
+
+    def _report(self, request, response, stats):
+        duration_ms = stats.duration * 1000
+        response["X-DB-Queries"] = str(stats.count)
+        response["X-DB-Time-Ms"] = f"{duration_ms:.1f}"
+        if stats.count > settings.QUERY_COUNT_WARNING:
+            print(
+                f"{request.method} {request.path} ran {stats.count} queries "
+                f"({duration_ms:.1f} ms)"
+            )
+        return response
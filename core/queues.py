@@ -0,0 +1,110 @@
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from huey import PriorityRedisHuey
+from huey.signals import SIGNAL_ENQUEUED, SIGNAL_EXECUTING
+from redis.exceptions import RedisError
+
+from core.redis_client import redis_client
+
+# Higher runs first within a queue
+CHAT_PRIORITY = 10
+CHAT_SUMMARY_PRIORITY = 0
+CONTRACT_PRIORITY = 0
+
+# Enqueue timestamps of tasks that never run (revoked, expired) age out
+ENQUEUED_AT_TTL = 60 * 60 * 24
+
+
+def _enqueued_key(name) -> str:
+    return f"queue:enqueued_at:{name}"
+
+
+def _stats_key(name) -> str:
+    return f"queue:stats:{name}"
+
+
+def _create_queue(key) -> PriorityRedisHuey:
+    config = settings.HUEY_QUEUES[key]
+    queue = PriorityRedisHuey(
+        config["name"],
+        url=settings.REDIS_URL,
+        immediate=config.get("immediate", False),
+    )
+
+    # Same connection hygiene as djhuey's db_task, for every task
+    @queue.pre_execute()
+    def close_db_before(task):
+        if not queue.immediate:
+            close_old_connections()
+
+    @queue.post_execute()
+    def close_db_after(task, task_value, exc):
+        if not queue.immediate:
+            close_old_connections()
+
+    @queue.signal(SIGNAL_ENQUEUED)
+    def record_enqueued(signal, task, exc=None):
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.hset(_enqueued_key(queue.name), task.id, time.time())
+            pipe.expire(_enqueued_key(queue.name), ENQUEUED_AT_TTL)
+            pipe.execute()
+        except RedisError:
+            pass
+
+    @queue.signal(SIGNAL_EXECUTING)
+    def record_wait(signal, task, exc=None):
+        try:
+            enqueued_at = redis_client.hget(_enqueued_key(queue.name), task.id)
+            if enqueued_at is None:
+                return
+            wait = time.time() - float(enqueued_at)
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.hdel(_enqueued_key(queue.name), task.id)
+            pipe.hincrby(_stats_key(queue.name), "executed", 1)
+            pipe.hincrbyfloat(_stats_key(queue.name), "wait_total", wait)
+            pipe.hset(_stats_key(queue.name), "last_wait", wait)
+            pipe.execute()
+        except RedisError:
+            pass
+
+    return queue
+
+
+chat_queue = _create_queue("chat")
+contract_queue = _create_queue("contracts")
+
+QUEUES = {
+    "chat": chat_queue,
+    "contracts": contract_queue,
+}
+
+
+def queue_metrics() -> dict:
+    """Depth and wait-time figures per queue."""
+    metrics = {}
+    for key, queue in QUEUES.items():
+        try:
+            stats = {
+                k.decode(): float(v)
+                for k, v in redis_client.hgetall(_stats_key(queue.name)).items()
+            }
+            depth = queue.pending_count()
+            scheduled = queue.scheduled_count()
+        except RedisError as e:
+            metrics[key] = {"error": str(e)}
+            continue
+
+        executed = int(stats.get("executed", 0))
+        metrics[key] = {
+            "depth": depth,
+            "scheduled": scheduled,
+            "executed": executed,
+            "avg_wait_seconds": (
+                stats.get("wait_total", 0.0) / executed if executed else 0.0
+            ),
+            "last_wait_seconds": stats.get("last_wait", 0.0),
+        }
+    return metrics
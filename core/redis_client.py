@@ -0,0 +1,11 @@
+import os
+
+from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379")
+
+redis_client = Redis.from_url(REDIS_URL, socket_connect_timeout=2)
+
+# For use inside the ASGI event loop (consumers, async views)
+async_redis_client = AsyncRedis.from_url(REDIS_URL, socket_connect_timeout=2)
@@ -0,0 +1,99 @@
+from urllib.parse import parse_qs
+
+import orjson
+from django.http import HttpResponse, JsonResponse
+from pydantic import BaseModel
+
+from core.compression import ENCODING_GZIP, FRAME_GZIP_LEVEL, compress
+
+# Frames smaller than this are not worth compressing
+FRAME_COMPRESSION_MIN_SIZE = 16 * 1024
+
+# datetimes, UUIDs, dataclasses and numpy arrays are handled natively
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    # Same fallback as json.dumps(default=str)
+    return str(obj)
+
+
+def dumps(obj) -> bytes:
+    """Compact UTF-8 JSON, for storage, HTTP and websocket payloads."""
+    if isinstance(obj, BaseModel):
+        # Serialized by pydantic-core directly, without an intermediate dict
+        return obj.__pydantic_serializer__.to_json(obj)
+    return orjson.dumps(obj, default=_default, option=_OPTIONS)
+
+
+def dumps_str(obj) -> str:
+    return dumps(obj).decode()
+
+
+def dumps_pretty(obj) -> str:
+    """Indented JSON for logs and debugging only; never store this."""
+    if isinstance(obj, BaseModel):
+        obj = obj.model_dump(mode="json")
+    return orjson.dumps(
+        obj, default=_default, option=_OPTIONS | orjson.OPT_INDENT_2
+    ).decode()
+
+
+def loads(data: bytes | str):
+    return orjson.loads(data)
+
+
+class OrjsonResponse(JsonResponse):
+    """JsonResponse encoded with orjson; `safe` behaves the same."""
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the "
+                "safe parameter to False."
+            )
+        kwargs.setdefault("content_type", "application/json")
+        HttpResponse.__init__(self, content=dumps(data), **kwargs)
+
+
+def encode_frame(payload) -> str:
+    """Websocket text frame of a payload, to encode once per group send."""
+    return dumps_str(payload)
+
+
+class FrameSenderMixin:
+    """
+    For websocket consumers. Group events may carry a pre-encoded `frame`
+    so a message fanned out to many sockets is encoded once by the
+    producer instead of once per consumer.
+
+    Clients connecting with `?compression=gzip` receive frames of at least
+    FRAME_COMPRESSION_MIN_SIZE (e.g. a finished report) as gzip-compressed
+    binary messages, which browsers can inflate with DecompressionStream.
+    """
+
+    @property
+    def frame_compression(self) -> str | None:
+        if not hasattr(self, "_frame_compression"):
+            query = parse_qs(self.scope.get("query_string", b"").decode())
+            requested = query.get("compression", [None])[0]
+            self._frame_compression = (
+                ENCODING_GZIP if requested == ENCODING_GZIP else None
+            )
+        return self._frame_compression
+
+    async def send_frame(self, frame_or_payload) -> None:
+        if not isinstance(frame_or_payload, str):
+            frame_or_payload = encode_frame(frame_or_payload)
+        if (
+            self.frame_compression
+            and len(frame_or_payload) >= FRAME_COMPRESSION_MIN_SIZE
+        ):
+            data = compress(
+                frame_or_payload.encode(), self.frame_compression, FRAME_GZIP_LEVEL
+            )
+            await self.send(bytes_data=data)
+            return
+        await self.send(text_data=frame_or_payload)
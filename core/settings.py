@@ -32,6 +32,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "channels",
+    "core",
     "documents",
     "chats",
     "huey.contrib.djhuey",
@@ -40,6 +41,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.QueryInstrumentationMiddleware",
+    # Compresses dynamic responses; precompressed artifacts pass through
+    "django.middleware.gzip.GZipMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -81,16 +85,84 @@ DATABASES = {
         "PASSWORD": os.environ.get("PG_PASSWORD", "kontrakku"),
         "HOST": os.environ.get("PG_HOST", "localhost"),
         "PORT": os.environ.get("PG_PORT", "5432"),
+        # Connections come from a per-process psycopg pool (Daphne and each
+        # huey worker process) and are returned to it at the end of every
+        # request / task, so CONN_MAX_AGE stays 0
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "pool": {
+                "min_size": int(os.environ.get("PG_POOL_MIN_SIZE", "2")),
+                "max_size": int(os.environ.get("PG_POOL_MAX_SIZE", "10")),
+                "timeout": int(os.environ.get("PG_POOL_TIMEOUT", "10")),
+            },
+        },
+    }
+}
+
+# Requests issuing more queries than this are reported as likely N+1s
+QUERY_COUNT_WARNING = int(os.environ.get("QUERY_COUNT_WARNING", "30"))
+
+# Chat turns can run directly on the ASGI event loop instead of huey; turns
+# beyond CHAT_ASYNC_MAX_CONCURRENCY fall back to the huey queue
+CHAT_ASYNC_EXECUTION = os.environ.get("CHAT_ASYNC_EXECUTION", "False").lower() == "true"
+CHAT_ASYNC_MAX_CONCURRENCY = int(os.environ.get("CHAT_ASYNC_MAX_CONCURRENCY", "32"))
+
+# Vector store ingestion (core.ai.ingestion): token budget per embedding
+# request, concurrent requests and the provider's per-minute limits
+EMBEDDING_BATCH_TOKENS = int(os.environ.get("EMBEDDING_BATCH_TOKENS", "50000"))
+EMBEDDING_WORKERS = int(os.environ.get("EMBEDDING_WORKERS", "4"))
+EMBEDDING_REQUESTS_PER_MINUTE = int(os.environ.get("EMBEDDING_REQUESTS_PER_MINUTE", "3000"))
+EMBEDDING_TOKENS_PER_MINUTE = int(os.environ.get("EMBEDDING_TOKENS_PER_MINUTE", "1000000"))
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379")
+
+# Read-through cache of status, report, listing and chat history reads;
+# see core/cache.py for key versioning and invalidation
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "kontrakku",
+        "TIMEOUT": 60 * 5,
+        "OPTIONS": {"socket_connect_timeout": 2},
     }
 }
 
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
-        "CONFIG": {"hosts": [("localhost", 6379)]},
+        "CONFIG": {"hosts": [REDIS_URL]},
     }
 }
 
+# Task queues
+# Interactive chat turns and long contract analyses run on separate huey
+# queues so one cannot starve the other. Each queue is consumed by its own
+# worker pool: `python manage.py run_queue chat` / `run_queue contracts`.
+# Queues listed in HUEY_IMMEDIATE (e.g. "chat,contracts") run their tasks
+# inline in the caller instead, for local development without workers.
+HUEY_IMMEDIATE = {
+    name.strip() for name in os.environ.get("HUEY_IMMEDIATE", "").split(",") if name.strip()
+}
+HUEY_QUEUES = {
+    "chat": {
+        "name": "kontrakku-chat",
+        "immediate": "chat" in HUEY_IMMEDIATE,
+        "consumer": {
+            "workers": int(os.environ.get("HUEY_CHAT_WORKERS", "8")),
+            "worker_type": "thread",
+        },
+    },
+    "contracts": {
+        "name": "kontrakku-contracts",
+        "immediate": "contracts" in HUEY_IMMEDIATE,
+        "consumer": {
+            "workers": int(os.environ.get("HUEY_CONTRACT_WORKERS", "2")),
+            "worker_type": os.environ.get("HUEY_CONTRACT_WORKER_TYPE", "process"),
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -152,6 +224,17 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Chunked contract uploads
+CONTRACT_UPLOAD_MAX_SIZE = int(
+    os.environ.get("CONTRACT_UPLOAD_MAX_SIZE", 50 * 1024 * 1024)
+)
+CONTRACT_UPLOAD_CHUNK_SIZE = int(
+    os.environ.get("CONTRACT_UPLOAD_CHUNK_SIZE", 5 * 1024 * 1024)
+)
+CONTRACT_UPLOAD_TEMP_DIR = MEDIA_ROOT / "uploads"
+# Seconds an unfinished upload is kept after its last chunk
+CONTRACT_UPLOAD_EXPIRY = int(os.environ.get("CONTRACT_UPLOAD_EXPIRY", 60 * 60 * 24))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
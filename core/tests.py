@@ -0,0 +1,138 @@
+import base64
+import threading
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from documents.models import Contract
+
+from .cache import acached, cache_key, cached, invalidate
+from .pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+    page_links,
+    page_size,
+)
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM)
+class CacheTests(TestCase):
+    """Namespaced read-through cache and its stampede lock."""
+
+    def setUp(self):
+        cache.clear()
+        self.producer = mock.Mock(side_effect=lambda: self.producer.call_count)
+
+    def test_value_is_computed_once(self):
+        self.assertEqual(cached("ns", ("a",), self.producer), 1)
+        self.assertEqual(cached("ns", ("a",), self.producer), 1)
+        self.assertEqual(cached("ns", ("b",), self.producer), 2)
+
+    def test_invalidate_bumps_the_namespace_on_commit(self):
+        cached("ns", ("a",), self.producer)
+        cached("other", ("a",), self.producer)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate("ns")
+            # Not before the transaction commits
+            self.assertEqual(cached("ns", ("a",), self.producer), 1)
+
+        self.assertEqual(cached("ns", ("a",), self.producer), 3)
+        self.assertEqual(cached("other", ("a",), self.producer), 2)
+
+    def test_waits_for_the_lock_holder_result(self):
+        key = cache_key("ns", "a")
+        cache.add(f"lock:{key}", 1)
+        threading.Timer(0.05, cache.set, (key, "computed elsewhere")).start()
+
+        self.assertEqual(cached("ns", ("a",), self.producer), "computed elsewhere")
+        self.producer.assert_not_called()
+
+    @mock.patch("core.cache.LOCK_WAIT", 0.05)
+    def test_computes_anyway_when_the_lock_holder_is_slow(self):
+        cache.add(f"lock:{cache_key('ns', 'a')}", 1)
+        self.assertEqual(cached("ns", ("a",), self.producer), 1)
+        # The lock holder stores the value, not the impatient reader
+        self.assertEqual(cached("ns", ("a",), self.producer), 2)
+
+    async def test_async_variant_shares_entries(self):
+        async def producer():
+            return "async"
+
+        self.assertEqual(await acached("ns", ("a",), producer), "async")
+        self.assertEqual(cached("ns", ("a",), self.producer), "async")
+        self.producer.assert_not_called()
+
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        contract = Contract(created_at=timezone.now())
+        self.assertEqual(
+            decode_cursor(encode_cursor(contract)),
+            (contract.created_at, contract.id),
+        )
+
+    def test_invalid_cursors(self):
+        for raw in ("no separator", "x|y", f"not a date|{uuid.uuid4()}"):
+            cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+            with self.assertRaises(InvalidCursor, msg=raw):
+                decode_cursor(cursor)
+        with self.assertRaises(InvalidCursor):
+            decode_cursor("???")
+
+    def test_page_size_is_clamped(self):
+        self.assertEqual(page_size("5"), 5)
+        self.assertEqual(page_size("0"), 1)
+        self.assertEqual(page_size("1000"), 100)
+        self.assertEqual(page_size("x"), 20)
+        self.assertEqual(page_size(None, default=10), 10)
+
+
+class KeysetPageTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.contracts = []
+        # Newest first, two sharing a created_at to exercise the id tiebreak
+        for age in (0, 1, 2, 2, 3):
+            contract = Contract.objects.create(file_name=f"{age}.pdf")
+            created_at = now - timedelta(minutes=age)
+            Contract.objects.filter(id=contract.id).update(created_at=created_at)
+            contract.created_at = created_at
+            self.contracts.append(contract)
+        self.contracts.sort(key=lambda c: (c.created_at, c.id), reverse=True)
+
+    def page(self, **kwargs):
+        items, has_more = keyset_page(Contract.objects.all(), 2, **kwargs)
+        return [c.id for c in items], has_more, page_links(items, has_more, **kwargs)
+
+    def ids(self, start, stop):
+        return [c.id for c in self.contracts[start:stop]]
+
+    def test_pages_older_and_back(self):
+        ids, has_more, links = self.page()
+        self.assertEqual((ids, has_more), (self.ids(0, 2), True))
+        self.assertIsNone(links["prev_cursor"])
+
+        ids, has_more, links = self.page(before=links["next_cursor"])
+        self.assertEqual((ids, has_more), (self.ids(2, 4), True))
+
+        last, has_more, last_links = self.page(before=links["next_cursor"])
+        self.assertEqual((last, has_more), (self.ids(4, 5), False))
+        self.assertIsNone(last_links["next_cursor"])
+
+        ids, has_more, links = self.page(after=links["prev_cursor"])
+        self.assertEqual((ids, has_more), (self.ids(0, 2), False))
+        self.assertIsNone(links["prev_cursor"])
+
+    def test_empty_page_has_no_links(self):
+        ids, has_more, links = self.page(before=encode_cursor(self.contracts[-1]))
+        self.assertEqual((ids, has_more), ([], False))
+        self.assertEqual(links, {"next_cursor": None, "prev_cursor": None})
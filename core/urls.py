@@ -1,15 +1,18 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from .api import MetricsAPI
 from .consumer import ChatConsumer, NotificationConsumer
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("api/v1/metrics", MetricsAPI.as_view(), name="api_metrics"),
     path("", include("documents.urls")),
     path("", include("chats.urls")),
 ]
 
 websocket_urlpatterns = [
     path("ws/notifications/", NotificationConsumer.as_asgi()),
+    path("ws/notifications/<uuid:contract_id>/", NotificationConsumer.as_asgi()),
     path("ws/chat/<uuid:contract_id>/", ChatConsumer.as_asgi()),
 ]
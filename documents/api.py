@@ -1,30 +1,74 @@
 import os
 import json
+import asyncio
 
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
-from .models import Contract
+from core.cache import acached, contract_list_namespace, contract_namespace
+from core.events import status_subscription
+from core.pagination import InvalidCursor, akeyset_page, page_links, page_size
+from core.serialization import OrjsonResponse, dumps, loads
+
+from .artifacts import artifact_response, store_json_artifact
+from .models import (
+    ARTIFACT_REPORT,
+    CONTRACT_DONE,
+    CONTRACT_PROCESSING_STATUS,
+    Contract,
+    ContractUpload,
+)
+from .reports import REPORT_VIEW_FULL, REPORT_VIEWS, build_report
 from .tasks import process_contract_task
+from .uploads import (
+    UploadError,
+    check_request_size,
+    start_upload,
+    validate_file,
+    write_chunk,
+)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
 class ContractUploadAPI(View):
-    def post(self, request, *args, **kwargs):
-        uploaded_file = request.FILES.get("file")
+    async def post(self, request, *args, **kwargs):
+        # Oversized bodies are refused before they are read
+        try:
+            check_request_size(request.headers.get("Content-Length"))
+        except UploadError as e:
+            return _upload_error(e)
+
+        # Multipart parsing may spool the upload to disk
+        files = await asyncio.to_thread(lambda: request.FILES)
+        uploaded_file = files.get("file")
 
         if not uploaded_file:
-            return JsonResponse({"error": "No file uploaded"}, status=400)
+            return OrjsonResponse({"error": "No file uploaded"}, status=400)
+        try:
+            file_name = await asyncio.to_thread(validate_file, uploaded_file)
+        except UploadError as e:
+            return _upload_error(e)
 
-        contract = Contract(file_path=uploaded_file)
-        contract.file_name = uploaded_file.name
-        contract.save()
+        contract = Contract(file_name=file_name)
+        user = await request.auser()
+        if user.is_authenticated:
+            contract.user = user
+        # Written to storage off the event loop; save=False keeps the
+        # database write on the async ORM below
+        await asyncio.to_thread(
+            contract.file_path.save, file_name, uploaded_file, save=False
+        )
+        await contract.asave()
 
-        process_contract_task(contract.id)
+        await sync_to_async(process_contract_task)(contract.id)
 
-        return JsonResponse(
+        return OrjsonResponse(
             {
                 "success": True,
                 "contract_id": str(contract.id),
@@ -33,47 +77,328 @@ class ContractUploadAPI(View):
         )
 
 
+# Columns needed to answer a status request; the report is loaded lazily
+STATUS_FIELDS = (
+    "id",
+    "file_name",
+    "file_path",
+    "status",
+    "stage",
+    "created_at",
+    "updated_at",
+)
+
+LONG_POLL_TIMEOUT = 25
+MAX_LONG_POLL_TIMEOUT = 60
+
+
+def _etag_matches(request, etag) -> bool:
+    etags = parse_etags(request.headers.get("If-None-Match", ""))
+    return "*" in etags or etag in etags
+
+
+def _not_modified(etag):
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    return response
+
+
+def _report_view(request) -> str | None:
+    view = request.GET.get("view", REPORT_VIEW_FULL)
+    return view if view in REPORT_VIEWS else None
+
+
+def _contract_report(contract, view=REPORT_VIEW_FULL):
+    report = build_report(contract, view)
+    # Reports stored before the report tables existed
+    if report is None:
+        try:
+            report = loads(contract.summarized_text)
+        except (TypeError, json.JSONDecodeError):
+            report = {"error": "Invalid JSON in summarized_text"}
+    return report
+
+
+async def _status_payload(contract_id, view=REPORT_VIEW_FULL) -> dict | None:
+    """
+    Encoded status body and ETag of a contract, or None if it does not
+    exist. Cached until the contract changes.
+    """
+
+    async def load():
+        try:
+            contract = await Contract.objects.only(*STATUS_FIELDS).aget(id=contract_id)
+        except Contract.DoesNotExist:
+            return None
+
+        response = {
+            "contract_id": str(contract.id),
+            "file_name": contract.file_name,
+            "status": contract.status,
+            "stage": contract.stage,
+            "created_at": contract.created_at,
+            "updated_at": contract.updated_at,
+        }
+
+        if contract.status == CONTRACT_DONE:
+            # Several report table reads; only on a cache miss
+            response["summary"] = await sync_to_async(_contract_report)(contract, view)
+
+        return {"etag": contract.status_etag(view), "body": dumps(response)}
+
+    return await acached(contract_namespace(contract_id), ("status", view), load)
+
+
+def _status_response(payload):
+    response = HttpResponse(payload["body"], content_type="application/json")
+    response["ETag"] = payload["etag"]
+    return response
+
+
 @method_decorator(csrf_exempt, name="dispatch")
 class ContractStatusAPI(View):
-    def get(self, request, contract_id, *args, **kwargs):
+    """
+    Status of a contract and, once DONE, its report. `view` selects part of
+    the report: full (default), summary, topics, clauses or risks.
+    """
+
+    async def get(self, request, contract_id, *args, **kwargs):
+        view = _report_view(request)
+        if view is None:
+            return OrjsonResponse({"error": "Invalid view"}, status=400)
+
+        payload = await _status_payload(contract_id, view)
+        if payload is None:
+            return OrjsonResponse({"error": "Contract not found"}, status=404)
+
+        if _etag_matches(request, payload["etag"]):
+            return _not_modified(payload["etag"])
+        return _status_response(payload)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class ContractStatusWatchAPI(View):
+    """
+    Long-poll variant of ContractStatusAPI. With If-None-Match set to the
+    last ETag, the request is held open until the pipeline publishes a
+    status/stage change or `timeout` seconds pass (304). Waiting costs no
+    database queries: re-reads only happen when Redis signals a change.
+    """
+
+    async def get(self, request, contract_id, *args, **kwargs):
+        view = _report_view(request)
+        if view is None:
+            return OrjsonResponse({"error": "Invalid view"}, status=400)
+
         try:
-            contract = Contract.objects.get(id=contract_id)
+            timeout = min(
+                float(request.GET.get("timeout", LONG_POLL_TIMEOUT)),
+                MAX_LONG_POLL_TIMEOUT,
+            )
+        except ValueError:
+            timeout = LONG_POLL_TIMEOUT
 
-            response = {
-                "contract_id": str(contract.id),
-                "file_name": contract.file_name,
-                "status": contract.status,
-                "created_at": contract.created_at,
-                "updated_at": contract.updated_at,
-            }
+        release_connection = sync_to_async(close_old_connections)
+        loop = asyncio.get_running_loop()
+        async with status_subscription(contract_id) as wait:
+            payload = await _status_payload(contract_id, view)
+            if payload is None:
+                return OrjsonResponse({"error": "Contract not found"}, status=404)
+
+            deadline = loop.time() + timeout
+            while _etag_matches(request, payload["etag"]):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return _not_modified(payload["etag"])
+                # Hand the pooled connection back while the request idles
+                await release_connection()
+                await wait(remaining)
+                payload = await _status_payload(contract_id, view)
 
-            if contract.status == "DONE":
-                try:
-                    response["summary"] = json.loads(contract.summarized_text)
-                except json.JSONDecodeError:
-                    response["summary"] = {"error": "Invalid JSON in summarized_text"}
+        return _status_response(payload)
 
-            return JsonResponse(response)
 
+@method_decorator(csrf_exempt, name="dispatch")
+class ContractReportAPI(View):
+    """
+    Full report of a finished contract, served from its precompressed
+    artifact (zstd or gzip by Accept-Encoding) with an ETag. Artifacts
+    missing for older contracts are built on first request.
+    """
+
+    def get(self, request, contract_id, *args, **kwargs):
+        response = artifact_response(
+            request, contract_id, ARTIFACT_REPORT, "application/json"
+        )
+        if response is not None:
+            return response
+
+        try:
+            contract = Contract.objects.only(*STATUS_FIELDS).get(id=contract_id)
         except Contract.DoesNotExist:
-            return JsonResponse({"error": "Contract not found"}, status=404)
+            return OrjsonResponse({"error": "Contract not found"}, status=404)
+        if contract.status != CONTRACT_DONE:
+            return OrjsonResponse(
+                {"error": "Report not ready", "status": contract.status}, status=409
+            )
+
+        store_json_artifact(contract, ARTIFACT_REPORT, _contract_report(contract))
+        return artifact_response(
+            request, contract_id, ARTIFACT_REPORT, "application/json"
+        )
 
 
 @method_decorator(csrf_exempt, name="dispatch")
 class ContractRetrieveAPI(View):
-    def get(self, request, *args, **kwargs):
-        contracts = Contract.objects.all().order_by("-created_at")
+    """
+    Newest-first contract listing, keyset-paginated on (created_at, id).
+    Query params: limit, before / after (cursors), status. Users list their
+    own contracts; anonymous requests only list unowned ones.
+    """
 
-        response = {
-            "contracts": [
-                {
-                    "contract_id": str(contract.id),
-                    "file_name": contract.file_name,
-                    "processing_status": contract.status,
-                    "created_at": contract.created_at,
-                }
-                for contract in contracts
-            ]
-        }
+    async def get(self, request, *args, **kwargs):
+        user = await request.auser()
+        user_id = user.id if user.is_authenticated else None
+        contracts = Contract.objects.only(
+            "id", "file_name", "status", "created_at", "user_id"
+        )
+        if user_id:
+            contracts = contracts.filter(user_id=user_id)
+        else:
+            contracts = contracts.filter(user__isnull=True)
+
+        status = request.GET.get("status")
+        if status:
+            if status not in dict(CONTRACT_PROCESSING_STATUS):
+                return OrjsonResponse({"error": "Invalid status"}, status=400)
+            contracts = contracts.filter(status=status)
+
+        before = request.GET.get("before")
+        after = request.GET.get("after")
+        limit = page_size(request.GET.get("limit"))
+
+        async def load():
+            page, has_more = await akeyset_page(
+                contracts, limit, before=before, after=after
+            )
+            return {
+                "contracts": [
+                    {
+                        "contract_id": str(contract.id),
+                        "file_name": contract.file_name,
+                        "processing_status": contract.status,
+                        "created_at": contract.created_at,
+                    }
+                    for contract in page
+                ],
+                **page_links(page, has_more, before=before, after=after),
+            }
+
+        try:
+            response = await acached(
+                contract_list_namespace(user_id),
+                ("page", status, before, after, limit),
+                load,
+            )
+        except InvalidCursor as e:
+            return OrjsonResponse({"error": str(e)}, status=400)
+
+        return OrjsonResponse(response)
+
+
+def _upload_response(upload, status=200):
+    response = OrjsonResponse(
+        {
+            "upload_id": str(upload.id),
+            "file_name": upload.file_name,
+            "size": upload.total_size,
+            "offset": upload.received_size,
+            "chunk_size": settings.CONTRACT_UPLOAD_CHUNK_SIZE,
+            "status": upload.status,
+            "contract_id": str(upload.contract_id) if upload.contract_id else None,
+        },
+        status=status,
+    )
+    response["Upload-Offset"] = str(upload.received_size)
+    return response
+
+
+def _own_uploads(request):
+    """Uploads of the requester, scoped like the contract listing."""
+    if request.user.is_authenticated:
+        return ContractUpload.objects.filter(user_id=request.user.id)
+    return ContractUpload.objects.filter(user__isnull=True)
+
+
+def _upload_error(error):
+    response = OrjsonResponse({"error": str(error)}, status=error.status)
+    if error.offset is not None:
+        response["Upload-Offset"] = str(error.offset)
+    return response
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class ContractUploadSessionAPI(View):
+    def post(self, request, *args, **kwargs):
+        try:
+            body = loads(request.body)
+            if not isinstance(body, dict):
+                raise TypeError("body must be an object")
+            size = int(body.get("size"))
+        except (json.JSONDecodeError, TypeError, ValueError):
+            return OrjsonResponse(
+                {"error": "file_name and size are required"}, status=400
+            )
+
+        user = request.user if request.user.is_authenticated else None
+        try:
+            upload = start_upload(body.get("file_name"), size, user=user)
+        except UploadError as e:
+            return _upload_error(e)
+
+        return _upload_response(upload, status=201)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class ContractUploadChunkAPI(View):
+    """
+    Resumable upload: PATCH sends the chunk starting at Upload-Offset
+    (optionally with an Upload-Checksum sha256 hex digest); GET/HEAD return
+    the current offset so an interrupted client knows where to resume.
+    """
+
+    def get(self, request, upload_id, *args, **kwargs):
+        try:
+            upload = _own_uploads(request).get(id=upload_id)
+        except ContractUpload.DoesNotExist:
+            return OrjsonResponse({"error": "Upload not found"}, status=404)
+        return _upload_response(upload)
+
+    def patch(self, request, upload_id, *args, **kwargs):
+        try:
+            upload = _own_uploads(request).get(id=upload_id)
+        except ContractUpload.DoesNotExist:
+            return OrjsonResponse({"error": "Upload not found"}, status=404)
+
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.headers["Content-Length"])
+        except (KeyError, ValueError):
+            return OrjsonResponse(
+                {"error": "Upload-Offset and Content-Length headers are required"},
+                status=400,
+            )
+
+        try:
+            upload = write_chunk(
+                upload,
+                offset,
+                request,
+                length,
+                checksum=request.headers.get("Upload-Checksum"),
+            )
+        except UploadError as e:
+            return _upload_error(e)
 
-        return JsonResponse(response)
+        upload.refresh_from_db()
+        return _upload_response(upload)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DocumentConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "documents"
+
+    def ready(self):
+        # Cache invalidation receivers
+        from . import signals  # noqa: F401
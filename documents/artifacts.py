@@ -0,0 +1,107 @@
+import hashlib
+
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+
+from core.cache import cached, contract_namespace, invalidate
+from core.compression import (
+    ENCODING_GZIP,
+    ENCODING_IDENTITY,
+    ENCODING_ZSTD,
+    compress,
+    decompress,
+    negotiate_encoding,
+)
+from core.serialization import dumps
+
+from .models import ContractArtifact
+
+# Stored encodings in server preference order; identity is served by
+# decompressing the gzip copy
+ARTIFACT_ENCODINGS = (ENCODING_ZSTD, ENCODING_GZIP)
+
+
+@transaction.atomic
+def store_artifact(contract, kind: str, data: bytes, encodings=ARTIFACT_ENCODINGS):
+    """Compresses `data` once per encoding, replacing the previous artifact."""
+    etag = quote_etag(hashlib.sha256(data).hexdigest()[:32])
+    ContractArtifact.objects.filter(contract=contract, kind=kind).delete()
+    ContractArtifact.objects.bulk_create(
+        ContractArtifact(
+            contract=contract,
+            user_id=contract.user_id,
+            kind=kind,
+            encoding=encoding,
+            etag=etag,
+            size=len(data),
+            data=compress(data, encoding),
+        )
+        for encoding in encodings
+    )
+    invalidate(contract_namespace(contract.id))
+    return etag
+
+
+def store_json_artifact(contract, kind: str, payload) -> str:
+    return store_artifact(contract, kind, dumps(payload))
+
+
+def load_artifact(contract_id, kind: str) -> bytes | None:
+    """Uncompressed content of an artifact, or None if none is stored."""
+    artifact = (
+        ContractArtifact.objects.filter(contract_id=contract_id, kind=kind)
+        .only("encoding", "data")
+        .first()
+    )
+    if artifact is None:
+        return None
+    return decompress(bytes(artifact.data), artifact.encoding)
+
+
+def artifact_response(request, contract_id, kind: str, content_type: str):
+    """
+    Serves a stored artifact in the best encoding the client accepts, with
+    its ETag; If-None-Match answers 304 without reading the payload.
+    Returns None if no artifact is stored.
+    """
+    namespace = contract_namespace(contract_id)
+    stored = cached(
+        namespace,
+        ("artifact", kind),
+        lambda: dict(
+            ContractArtifact.objects.filter(
+                contract_id=contract_id, kind=kind
+            ).values_list("encoding", "etag")
+        ),
+    )
+    if not stored:
+        return None
+
+    etag = next(iter(stored.values()))
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        encoding = negotiate_encoding(
+            request.headers.get("Accept-Encoding", ""),
+            [encoding for encoding in ARTIFACT_ENCODINGS if encoding in stored],
+        )
+        source = encoding if encoding in stored else next(iter(stored))
+        data = cached(
+            namespace,
+            ("artifact", kind, source),
+            lambda: bytes(
+                ContractArtifact.objects.values_list("data", flat=True).get(
+                    contract_id=contract_id, kind=kind, encoding=source
+                )
+            ),
+        )
+        if encoding == ENCODING_IDENTITY:
+            data = decompress(data, source)
+        response = HttpResponse(data, content_type=content_type)
+        if encoding != ENCODING_IDENTITY:
+            response["Content-Encoding"] = encoding
+
+    response["ETag"] = etag
+    response["Vary"] = "Accept-Encoding"
+    return response
@@ -0,0 +1,283 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from core.ai.chroma import openai_ef
+
+from .preparation import (
+    UU_13_2003_TITLE,
+    UU_PATTERNS,
+    UU_REFERENCE_COLLECTION,
+    ParsePatterns,
+    ensure_uu_reference_collection,
+)
+from .retrieval import extract_pasal_numbers, get_hybrid_retriever, tokenize
+
+# Shards queried for one question; each adds a parallel Chroma query
+MAX_SHARDS = 3
+
+# Question tokens that route to a topic
+TOPIC_KEYWORDS = {
+    "hubungan_kerja": {
+        "pkwt",
+        "pkwtt",
+        "kontrak",
+        "perjanjian",
+        "percobaan",
+        "magang",
+        "perpanjangan",
+    },
+    "alih_daya": {"outsourcing", "outsource", "alih", "daya", "vendor"},
+    "upah": {
+        "upah",
+        "gaji",
+        "ump",
+        "umk",
+        "umr",
+        "minimum",
+        "tunjangan",
+        "thr",
+        "bonus",
+    },
+    "waktu_kerja": {"jam", "lembur", "shift", "istirahat", "cuti", "libur"},
+    "phk": {
+        "phk",
+        "pemutusan",
+        "pesangon",
+        "resign",
+        "mengundurkan",
+        "pensiun",
+        "kompensasi",
+    },
+    "jaminan_sosial": {"bpjs", "jaminan", "asuransi", "kecelakaan", "kesehatan"},
+    "tenaga_kerja_asing": {"asing", "tka", "ekspatriat"},
+}
+ALL_TOPICS = frozenset(TOPIC_KEYWORDS)
+
+# Regional regulations are often converted without BAB headings and with
+# Pasal at any heading level
+REGIONAL_PATTERNS = ParsePatterns(
+    pasal=re.compile(r"^#{1,4}\s*Pasal\s+(\d+)", re.IGNORECASE),
+)
+
+# UU 6/2023 amends other laws from within its own Pasal (### Pasal 81),
+# each restating the amended Pasal (#### Pasal 59, #### Pasal 61A)
+CIPTA_KERJA_PATTERNS = ParsePatterns(
+    pasal=re.compile(r"^####\s*Pasal\s+(\d+[A-Z]?)\b", re.IGNORECASE),
+    amendment=re.compile(r"^###\s*Pasal\s+(\d+)", re.IGNORECASE),
+    paragraf=re.compile(r"^#####\s*Paragraf\s+(\d+)", re.IGNORECASE),
+)
+
+
+class Regulation:
+    """
+    A regulation of the legal corpus. Each one is parsed with its own
+    ParsePatterns and indexed into its own collection (shard), so a
+    question only searches the regulations its topics route to.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        title: str,
+        file_path: str,
+        collection_name: str,
+        topics=ALL_TOPICS,
+        aliases: tuple[str, ...] = (),
+        patterns: ParsePatterns = UU_PATTERNS,
+        default: bool = False,
+    ):
+        self.key = key
+        self.title = title
+        self.file_path = file_path
+        self.collection_name = collection_name
+        self.topics = frozenset(topics)
+        # Lowercase phrases that name the regulation in a question
+        self.aliases = aliases
+        self.patterns = patterns
+        # Searched when a question matches no topic
+        self.default = default
+
+    @property
+    def available(self) -> bool:
+        return os.path.exists(self.file_path)
+
+    def collection(self, force_recreate: bool = False):
+        return ensure_uu_reference_collection(
+            self.file_path,
+            self.collection_name,
+            force_recreate=force_recreate,
+            title=self.title,
+            patterns=self.patterns,
+        )
+
+
+REGULATIONS: dict[str, Regulation] = {}
+
+
+def register(regulation: Regulation) -> Regulation:
+    REGULATIONS[regulation.key] = regulation
+    return regulation
+
+
+def register_regional_wage_regulation(
+    key: str, title: str, file_path: str, region: str, **kwargs
+) -> Regulation:
+    """
+    Registers a provincial or regency wage regulation (UMP/UMK). Questions
+    naming the region are routed to it.
+    """
+    kwargs.setdefault("patterns", REGIONAL_PATTERNS)
+    return register(
+        Regulation(
+            key,
+            title,
+            file_path,
+            collection_name=f"upah_{key}",
+            topics={"upah"},
+            aliases=(region.lower(),),
+            **kwargs,
+        )
+    )
+
+
+register(
+    Regulation(
+        "uu_13_2003",
+        UU_13_2003_TITLE,
+        "media/uu_13_2003_gemini.md",
+        UU_REFERENCE_COLLECTION,
+        aliases=("uu 13", "13/2003", "13 tahun 2003", "uu ketenagakerjaan"),
+        default=True,
+    )
+)
+register(
+    Regulation(
+        "uu_6_2023",
+        "UNDANG-UNDANG REPUBLIK INDONESIA NOMOR 6 TAHUN 2023 TENTANG PENETAPAN "
+        "PERATURAN PEMERINTAH PENGGANTI UNDANG-UNDANG NOMOR 2 TAHUN 2022 TENTANG "
+        "CIPTA KERJA MENJADI UNDANG-UNDANG",
+        "media/uu_6_2023_cipta_kerja.md",
+        "uu_cipta_kerja",
+        topics={"hubungan_kerja", "alih_daya", "upah", "waktu_kerja", "phk"},
+        aliases=("cipta kerja", "omnibus", "6/2023", "perppu 2/2022"),
+        patterns=CIPTA_KERJA_PATTERNS,
+        default=True,
+    )
+)
+register(
+    Regulation(
+        "pp_35_2021",
+        "PERATURAN PEMERINTAH REPUBLIK INDONESIA NOMOR 35 TAHUN 2021 TENTANG "
+        "PERJANJIAN KERJA WAKTU TERTENTU, ALIH DAYA, WAKTU KERJA DAN WAKTU "
+        "ISTIRAHAT, DAN PEMUTUSAN HUBUNGAN KERJA",
+        "media/pp_35_2021.md",
+        "pp_35_2021",
+        topics={"hubungan_kerja", "alih_daya", "waktu_kerja", "phk"},
+        aliases=("pp 35", "35/2021", "35 tahun 2021"),
+    )
+)
+
+
+def route_query(question: str, max_shards: int = MAX_SHARDS) -> list[Regulation]:
+    """
+    Regulations to search for a question: those it names first, then those
+    covering most of its topics, else the default ones. Regulations whose
+    source file is missing are skipped.
+    """
+    available = [r for r in REGULATIONS.values() if r.available]
+    text = question.lower()
+    tokens = set(tokenize(question))
+    topics = {topic for topic, words in TOPIC_KEYWORDS.items() if tokens & words}
+
+    named = [r for r in available if any(alias in text for alias in r.aliases)]
+    by_topic = sorted(
+        (r for r in available if r not in named and r.topics & topics),
+        key=lambda r: len(r.topics & topics),
+        reverse=True,
+    )
+    routed = named + by_topic
+    if not routed:
+        routed = [r for r in available if r.default]
+    return routed[:max_shards]
+
+
+_executor = ThreadPoolExecutor(max_workers=MAX_SHARDS, thread_name_prefix="corpus")
+
+
+def query_corpus(
+    question: str,
+    n_results: int = 2,
+    regulations: list[Regulation] | None = None,
+    expand: bool = True,
+    token_budget: int = 1500,
+    rrf_k: int = 60,
+) -> list[dict]:
+    """
+    Searches the routed shards in parallel and keeps the best `n_results`
+    hits. Shard scores are not comparable (RRF, BM25 or direct lookups), so
+    hits are merged by reciprocal rank fusion over their rank within their
+    shard, explicit Pasal matches first and ties in routing order. With
+    `expand`, each hit's cited Pasal are appended from its own regulation.
+    Hits carry the key of their regulation under "regulation".
+    """
+    if regulations is None:
+        regulations = route_query(question)
+    # Collections are resolved here; only the searches run in the pool
+    shards = []
+    for regulation in regulations:
+        try:
+            retriever = get_hybrid_retriever(regulation.collection())
+        except Exception as e:
+            print(f"⚠️ Skipping shard '{regulation.key}': {e}")
+            continue
+        shards.append((regulation, retriever))
+    if not shards:
+        return []
+
+    # Embedded once for all shards, unless every shard can answer the
+    # named Pasal directly
+    pasal_numbers = extract_pasal_numbers(question)
+    query_embedding = None
+    if not pasal_numbers or any(
+        not any(number in retriever.pasal_index for number in pasal_numbers)
+        for _, retriever in shards
+    ):
+        query_embedding = openai_ef([question])[0]
+
+    def search(shard, order):
+        regulation, retriever = shard
+        try:
+            hits = retriever.query(
+                question, n_results=n_results, query_embedding=query_embedding
+            )
+        except Exception as e:
+            print(f"⚠️ Query on shard '{regulation.key}' failed: {e}")
+            return []
+        return [
+            ((hit["source"] == "pasal", 1 / (rrf_k + rank + 1), -order), shard, hit)
+            for rank, hit in enumerate(hits)
+        ]
+
+    results = [
+        item
+        for hits in _executor.map(search, shards, range(len(shards)))
+        for item in hits
+    ]
+    results.sort(key=lambda item: item[0], reverse=True)
+    results = results[:n_results]
+
+    grouped: dict[str, tuple] = {}
+    for _, shard, hit in results:
+        grouped.setdefault(shard[0].key, (shard, []))[1].append(hit)
+
+    merged = []
+    for (regulation, retriever), hits in grouped.values():
+        if expand:
+            hits = retriever.expand_references(
+                hits, token_budget=token_budget // len(grouped), question=question
+            )
+        for hit in hits:
+            hit["regulation"] = regulation.key
+        merged.extend(hits)
+    return merged
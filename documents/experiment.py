@@ -1,14 +1,10 @@
-from django.db.models import Q
-
 from .methods import process_contract
-from .models import Contract
+from .models import ARTIFACT_SUMMARIZED_TEXT, Contract
 
 
 def run_process_latest_contract():
     contract = (
-        Contract.objects.filter(
-            Q(summarized_text__exact="") | Q(summarized_text__isnull=True)
-        )
+        Contract.objects.exclude(artifacts__kind=ARTIFACT_SUMMARIZED_TEXT)
         .order_by("-id")
         .first()
     )
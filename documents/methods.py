@@ -1,14 +1,32 @@
+import hashlib
 import json
 import re
 from typing import Any, Dict, List, Union
 
+from django.db import transaction
 from django.utils import timezone
 from pydantic import BaseModel, Field, ValidationError
 
+from chats.answer_cache import invalidate_answers
 from core.ai.mistral import mistral
 from core.ai.prompt_manager import PromptManager
-from core.methods import send_chat_message, send_notification
-from documents.models import CONTRACT_DONE, Contract
+from core.events import publish_status
+from core.methods import ProgressNotifier, send_chat_message
+from core.serialization import dumps_str
+from documents.artifacts import store_json_artifact
+from documents.signals import invalidate_contract_cache
+from documents.models import (
+    ARTIFACT_REPORT,
+    CONTRACT_DONE,
+    CONTRACT_PROCESSING,
+    CONTRACT_STAGE_ANALYZING,
+    CONTRACT_STAGE_DONE,
+    CONTRACT_STAGE_OCR,
+    CONTRACT_STAGE_SPLITTING,
+    CONTRACT_STAGE_SUMMARIZING,
+    Contract,
+)
+from documents.reports import build_report, save_report
 
 IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
 
@@ -74,9 +92,7 @@ def check_subpoints(clause_md: str, bullets: List[str]) -> List[bool]:
     )
     pm.add_message(
         "user",
-        json.dumps(
-            {"clause_markdown": clause_md, "subpoints": bullets}, ensure_ascii=False
-        ),
+        dumps_str({"clause_markdown": clause_md, "subpoints": bullets}),
     )
 
     try:
@@ -278,12 +294,30 @@ CHECKLIST: Dict[int, Dict[str, Any]] = {
 TITLE_MAP = {v["title"].lower(): k for k, v in CHECKLIST.items()}
 
 
+def set_contract_stage(contract: Contract, stage: str, status=CONTRACT_PROCESSING):
+    """Persists a pipeline step and wakes clients waiting on the status."""
+    contract.status = status
+    contract.stage = stage
+    contract.updated_at = timezone.now()
+    Contract.objects.filter(id=contract.id).update(
+        status=status, stage=stage, updated_at=contract.updated_at
+    )
+    # update() sends no post_save, so invalidate explicitly
+    invalidate_contract_cache(contract)
+    publish_status(contract.id, status)
+
+
 def process_contract(contract_id):
     contract = Contract.objects.get(id=contract_id)
     file_name = contract.file_path.name
+    notifier = ProgressNotifier(contract_id=contract.id, user_id=contract.user_id)
+
+    # Answers cached for a previous run may not match the new analysis
+    invalidate_answers(contract.id)
 
     # 1. OCR upload & processing
-    send_notification(
+    set_contract_stage(contract, CONTRACT_STAGE_OCR)
+    notifier.notify(
         notification_type="Document Processing", content=f"Membaca dokumen"
     )
     uploaded_pdf = mistral.files.upload(
@@ -308,7 +342,8 @@ def process_contract(contract_id):
     content = remove_images_from_md(content)
 
     # 3. Split Markdown into clauses
-    send_notification(
+    set_contract_stage(contract, CONTRACT_STAGE_SPLITTING)
+    notifier.notify(
         notification_type="Document Processing", content=f"Memecah dokumen per klausa"
     )
     splitter = PromptManager()
@@ -327,13 +362,14 @@ def process_contract(contract_id):
         print(clause[:20])
     print()
 
-    send_notification(
+    notifier.notify(
         notification_type="Document Processing",
         content=f"Dokumen dipecah sebanyak {len(clauses)} bagian",
     )
 
     # 4. Analyze each clause
-    send_notification(
+    set_contract_stage(contract, CONTRACT_STAGE_ANALYZING)
+    notifier.notify(
         notification_type="Document Processing",
         content=f"Menganalisa dokumen per bagian",
     )
@@ -342,7 +378,7 @@ def process_contract(contract_id):
     report_clauses: list[dict] = []
 
     for idx, clause_md in enumerate(clauses, 1):
-        send_notification(
+        notifier.notify(
             notification_type="Document Processing",
             content=f"Memeriksa bagian - {idx}/{len(clauses)}",
         )
@@ -379,7 +415,8 @@ def process_contract(contract_id):
         )
 
     # 5. Contract-level summary
-    send_notification(
+    set_contract_stage(contract, CONTRACT_STAGE_SUMMARIZING)
+    notifier.notify(
         notification_type="Document Processing", content=f"Meringkas isi dari kontrak"
     )
     pm_summary = PromptManager()
@@ -402,18 +439,24 @@ def process_contract(contract_id):
         "clauses": report_clauses,
     }
 
-    # validate json
-    pretty_json = json.dumps(report, ensure_ascii=False, indent=2, default=str)
-
     contract.raw_text = content
-    contract.summarized_text = pretty_json
+    contract.content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    # The report lives in the report tables and the report artifact; the
+    # legacy JSON blob of a reprocessed contract is dropped
+    contract.summarized_text = None
     contract.status = CONTRACT_DONE
+    contract.stage = CONTRACT_STAGE_DONE
     contract.updated_at = timezone.now()
-    contract.save()
+    with transaction.atomic():
+        contract.save()
+        save_report(contract, report)
+        store_json_artifact(contract, ARTIFACT_REPORT, build_report(contract))
+    publish_status(contract.id, contract.status)
 
-    send_notification(
+    notifier.notify(
         notification_type="Document Processing", content=f"Pemrosesan selesai"
     )
-    send_notification(notification_type="Processing Done", content=report)
+    notifier.notify(notification_type="Processing Done", content=report, final=True)
+    notifier.close()
 
     return report
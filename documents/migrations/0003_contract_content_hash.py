@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:47
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_content_hash(apps, schema_editor):
+    Contract = apps.get_model("documents", "Contract")
+    contracts = Contract.objects.exclude(raw_text__isnull=True).exclude(raw_text="")
+    for contract in contracts.only("id", "raw_text").iterator(chunk_size=100):
+        Contract.objects.filter(id=contract.id).update(
+            content_hash=hashlib.sha256(contract.raw_text.encode("utf-8")).hexdigest()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0002_alter_contract_user"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contract",
+            name="content_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0004_contractupload"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="contract",
+            index=models.Index(
+                fields=["created_at", "id"], name="contract_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="contract",
+            index=models.Index(
+                fields=["user", "created_at", "id"], name="contract_user_created_idx"
+            ),
+        ),
+    ]
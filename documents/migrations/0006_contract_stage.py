@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0005_contract_listing_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contract",
+            name="stage",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("OCR", "Reading document"),
+                    ("SPLITTING", "Splitting clauses"),
+                    ("ANALYZING", "Analyzing clauses"),
+                    ("SUMMARIZING", "Summarizing"),
+                    ("DONE", "Done"),
+                ],
+                max_length=50,
+            ),
+        ),
+    ]
@@ -0,0 +1,294 @@
+# Generated by Django 5.2.1 on 2026-10-19 10:59
+
+import json
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_report_tables(apps, schema_editor):
+    Contract = apps.get_model("documents", "Contract")
+    ContractClause = apps.get_model("documents", "ContractClause")
+    ClauseQuestion = apps.get_model("documents", "ClauseQuestion")
+    ContractTopicCoverage = apps.get_model("documents", "ContractTopicCoverage")
+    ContractRiskSummary = apps.get_model("documents", "ContractRiskSummary")
+
+    contracts = Contract.objects.filter(status="DONE").exclude(
+        summarized_text__isnull=True
+    )
+    for contract in contracts.only("id", "user_id", "summarized_text").iterator(
+        chunk_size=100
+    ):
+        try:
+            report = json.loads(contract.summarized_text)
+        except json.JSONDecodeError:
+            continue
+
+        report_clauses = report.get("clauses", [])
+        clauses = ContractClause.objects.bulk_create(
+            ContractClause(
+                contract_id=contract.id,
+                user_id=contract.user_id,
+                position=position,
+                topic=clause.get("clauseTopic") or "",
+                content=clause.get("clauseContent") or "",
+                summary=clause.get("clauseSummary") or "",
+                vague=bool(clause.get("vague")),
+                red_flag=bool(clause.get("redFlag")),
+                issue_reason=clause.get("issueReason") or "",
+            )
+            for position, clause in enumerate(report_clauses)
+        )
+        questions = ClauseQuestion.objects.bulk_create(
+            ClauseQuestion(
+                clause=clause,
+                user_id=contract.user_id,
+                position=position,
+                question=question,
+            )
+            for clause, data in zip(clauses, report_clauses)
+            for position, question in enumerate(data.get("questions") or [])
+        )
+
+        covered = report.get("coveredTopic", [])
+        uncovered = report.get("uncoveredTopic", [])
+        ContractTopicCoverage.objects.bulk_create(
+            ContractTopicCoverage(
+                contract_id=contract.id,
+                user_id=contract.user_id,
+                position=position,
+                topic=topic,
+                covered=position < len(covered),
+            )
+            for position, topic in enumerate(covered + uncovered)
+        )
+
+        ContractRiskSummary.objects.create(
+            contract_id=contract.id,
+            user_id=contract.user_id,
+            contract_summary=report.get("contractSummary") or "",
+            clause_count=len(clauses),
+            red_flag_count=sum(clause.red_flag for clause in clauses),
+            vague_count=sum(clause.vague for clause in clauses),
+            question_count=len(questions),
+            covered_count=len(covered),
+            uncovered_count=len(uncovered),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0006_contract_stage"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContractClause",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("position", models.PositiveIntegerField()),
+                ("topic", models.CharField(max_length=255)),
+                ("content", models.TextField()),
+                ("summary", models.TextField(blank=True)),
+                ("vague", models.BooleanField(default=False)),
+                ("red_flag", models.BooleanField(default=False)),
+                ("issue_reason", models.TextField(blank=True)),
+                (
+                    "contract",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="clauses",
+                        to="documents.contract",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["position"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ClauseQuestion",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("position", models.PositiveIntegerField()),
+                ("question", models.TextField()),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "clause",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="questions",
+                        to="documents.contractclause",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["position"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ContractRiskSummary",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("contract_summary", models.TextField(blank=True)),
+                ("clause_count", models.PositiveIntegerField(default=0)),
+                ("red_flag_count", models.PositiveIntegerField(default=0)),
+                ("vague_count", models.PositiveIntegerField(default=0)),
+                ("question_count", models.PositiveIntegerField(default=0)),
+                ("covered_count", models.PositiveIntegerField(default=0)),
+                ("uncovered_count", models.PositiveIntegerField(default=0)),
+                (
+                    "contract",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="risk_summary",
+                        to="documents.contract",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ContractTopicCoverage",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("position", models.PositiveIntegerField()),
+                ("topic", models.CharField(max_length=255)),
+                ("covered", models.BooleanField(default=False)),
+                (
+                    "contract",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="topic_coverage",
+                        to="documents.contract",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["position"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="contractclause",
+            index=models.Index(
+                fields=["topic", "red_flag", "created_at"], name="clause_topic_risk_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="contractclause",
+            index=models.Index(
+                condition=models.Q(
+                    ("red_flag", True), ("vague", True), _connector="OR"
+                ),
+                fields=["contract", "position"],
+                name="clause_contract_risk_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="contractclause",
+            constraint=models.UniqueConstraint(
+                fields=("contract", "position"), name="clause_contract_position_uniq"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="clausequestion",
+            index=models.Index(
+                fields=["clause", "position"], name="question_clause_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="contractrisksummary",
+            index=models.Index(
+                fields=["red_flag_count"], name="risk_red_flag_count_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="contracttopiccoverage",
+            index=models.Index(fields=["topic", "covered"], name="coverage_topic_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="contracttopiccoverage",
+            constraint=models.UniqueConstraint(
+                fields=("contract", "topic"), name="coverage_contract_topic_uniq"
+            ),
+        ),
+        migrations.RunPython(backfill_report_tables, migrations.RunPython.noop),
+    ]
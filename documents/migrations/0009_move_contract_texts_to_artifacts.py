@@ -0,0 +1,79 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:04
+
+import hashlib
+
+import zstandard
+from django.db import migrations, models
+
+TEXT_FIELDS = ("raw_text", "summarized_text")
+
+
+def move_texts_to_artifacts(apps, schema_editor):
+    Contract = apps.get_model("documents", "Contract")
+    ContractArtifact = apps.get_model("documents", "ContractArtifact")
+    compressor = zstandard.ZstdCompressor(level=19)
+
+    contracts = Contract.objects.only("id", "user_id", *TEXT_FIELDS)
+    for contract in contracts.iterator(chunk_size=100):
+        artifacts = []
+        for kind in TEXT_FIELDS:
+            value = getattr(contract, kind)
+            if not value:
+                continue
+            data = value.encode("utf-8")
+            artifacts.append(
+                ContractArtifact(
+                    contract_id=contract.id,
+                    user_id=contract.user_id,
+                    kind=kind,
+                    encoding="zstd",
+                    etag='"%s"' % hashlib.sha256(data).hexdigest()[:32],
+                    size=len(data),
+                    data=compressor.compress(data),
+                )
+            )
+        ContractArtifact.objects.bulk_create(artifacts)
+
+
+def move_texts_to_contracts(apps, schema_editor):
+    Contract = apps.get_model("documents", "Contract")
+    ContractArtifact = apps.get_model("documents", "ContractArtifact")
+    decompressor = zstandard.ZstdDecompressor()
+
+    artifacts = ContractArtifact.objects.filter(kind__in=TEXT_FIELDS, encoding="zstd")
+    for artifact in artifacts.iterator(chunk_size=100):
+        Contract.objects.filter(id=artifact.contract_id).update(
+            **{artifact.kind: decompressor.decompress(artifact.data).decode("utf-8")}
+        )
+    artifacts.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0008_contractartifact"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="contractartifact",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("report", "Report"),
+                    ("raw_text", "Raw text"),
+                    ("summarized_text", "Summarized text"),
+                ],
+                max_length=50,
+            ),
+        ),
+        migrations.RunPython(move_texts_to_artifacts, move_texts_to_contracts),
+        migrations.RemoveField(
+            model_name="contract",
+            name="raw_text",
+        ),
+        migrations.RemoveField(
+            model_name="contract",
+            name="summarized_text",
+        ),
+    ]
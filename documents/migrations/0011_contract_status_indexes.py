@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-19 11:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0010_vectorcollectionalias"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Listings always filter on user_id or user IS NULL
+        migrations.RemoveIndex(
+            model_name="contract",
+            name="contract_created_idx",
+        ),
+        migrations.AddIndex(
+            model_name="contract",
+            index=models.Index(
+                fields=["user", "status", "created_at", "id"],
+                name="contract_user_status_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0011_contract_status_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contractupload",
+            name="writing_since",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
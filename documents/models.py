@@ -1,7 +1,23 @@
-from django.db import models
+import hashlib
 
+from django.db import models, transaction
+from django.utils.http import quote_etag
+
+from core.compression import ENCODING_ZSTD
 from core.models import BaseModel
 
+ARTIFACT_REPORT = "report"
+ARTIFACT_RAW_TEXT = "raw_text"
+ARTIFACT_SUMMARIZED_TEXT = "summarized_text"
+
+ARTIFACT_KINDS = (
+    (ARTIFACT_REPORT, "Report"),
+    (ARTIFACT_RAW_TEXT, "Raw text"),
+    (ARTIFACT_SUMMARIZED_TEXT, "Summarized text"),
+)
+# Contract text columns backed by artifacts
+ARTIFACT_TEXT_KINDS = (ARTIFACT_RAW_TEXT, ARTIFACT_SUMMARIZED_TEXT)
+
 CONTRACT_PENDING = "PENDING"
 CONTRACT_PROCESSING = "PROCESSING"
 CONTRACT_DONE = "DONE"
@@ -12,6 +28,21 @@ CONTRACT_PROCESSING_STATUS = (
     (CONTRACT_DONE, "Done"),
 )
 
+# Pipeline steps of a PROCESSING contract
+CONTRACT_STAGE_OCR = "OCR"
+CONTRACT_STAGE_SPLITTING = "SPLITTING"
+CONTRACT_STAGE_ANALYZING = "ANALYZING"
+CONTRACT_STAGE_SUMMARIZING = "SUMMARIZING"
+CONTRACT_STAGE_DONE = "DONE"
+
+CONTRACT_STAGES = (
+    (CONTRACT_STAGE_OCR, "Reading document"),
+    (CONTRACT_STAGE_SPLITTING, "Splitting clauses"),
+    (CONTRACT_STAGE_ANALYZING, "Analyzing clauses"),
+    (CONTRACT_STAGE_SUMMARIZING, "Summarizing"),
+    (CONTRACT_STAGE_DONE, "Done"),
+)
+
 
 class Contract(BaseModel):
     file_name = models.CharField(max_length=255)
@@ -19,5 +50,253 @@ class Contract(BaseModel):
     status = models.CharField(
         max_length=50, choices=CONTRACT_PROCESSING_STATUS, default=CONTRACT_PENDING
     )
-    raw_text = models.TextField(blank=True, null=True)
-    summarized_text = models.TextField(blank=True, null=True)
+    stage = models.CharField(max_length=50, choices=CONTRACT_STAGES, blank=True)
+    file_hash = models.CharField(max_length=64, blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the contract listing, which is always
+            # scoped to a user or to unowned contracts (user IS NULL)
+            models.Index(
+                fields=["user", "created_at", "id"], name="contract_user_created_idx"
+            ),
+            # Same, filtered by ?status=
+            models.Index(
+                fields=["user", "status", "created_at", "id"],
+                name="contract_user_status_idx",
+            ),
+        ]
+
+    # raw_text (OCR markdown) and summarized_text (report JSON of contracts
+    # processed before the report tables existed; no longer written) are
+    # kept zstd-compressed in ContractArtifact so contract rows stay small.
+    # They are loaded on first access and written by save().
+
+    @property
+    def raw_text(self) -> str | None:
+        return self._get_text(ARTIFACT_RAW_TEXT)
+
+    @raw_text.setter
+    def raw_text(self, value: str | None):
+        self._set_text(ARTIFACT_RAW_TEXT, value)
+
+    @property
+    def summarized_text(self) -> str | None:
+        return self._get_text(ARTIFACT_SUMMARIZED_TEXT)
+
+    @summarized_text.setter
+    def summarized_text(self, value: str | None):
+        self._set_text(ARTIFACT_SUMMARIZED_TEXT, value)
+
+    def _get_text(self, kind) -> str | None:
+        texts = self.__dict__.setdefault("_texts", {})
+        if kind not in texts:
+            from .artifacts import load_artifact
+
+            data = None if self._state.adding else load_artifact(self.id, kind)
+            texts[kind] = data.decode("utf-8") if data is not None else None
+        return texts[kind]
+
+    def _set_text(self, kind, value: str | None) -> None:
+        self.__dict__.setdefault("_texts", {})[kind] = value
+        self.__dict__.setdefault("_dirty_texts", set()).add(kind)
+
+    def save(self, *args, **kwargs):
+        from .artifacts import store_artifact
+
+        dirty = self.__dict__.get("_dirty_texts", set())
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            for kind in sorted(dirty):
+                value = self._texts[kind]
+                if value:
+                    store_artifact(
+                        self, kind, value.encode("utf-8"), encodings=(ENCODING_ZSTD,)
+                    )
+                else:
+                    ContractArtifact.objects.filter(contract=self, kind=kind).delete()
+        self.__dict__.pop("_dirty_texts", None)
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.__dict__.pop("_texts", None)
+        self.__dict__.pop("_dirty_texts", None)
+
+    def status_etag(self, view: str) -> str:
+        """
+        Changes whenever the status, stage or report of the contract does.
+        Each report view is a different representation, so the view is part
+        of the tag.
+        """
+        version = f"{self.status}:{self.stage}:{self.updated_at.isoformat()}:{view}"
+        return quote_etag(hashlib.sha1(version.encode()).hexdigest())
+
+
+UPLOAD_IN_PROGRESS = "UPLOADING"
+UPLOAD_COMPLETE = "COMPLETE"
+
+UPLOAD_STATUS = (
+    (UPLOAD_IN_PROGRESS, "Uploading"),
+    (UPLOAD_COMPLETE, "Complete"),
+)
+
+
+class ContractUpload(BaseModel):
+    """
+    Resumable chunked upload of a contract file. Chunks are appended to
+    temp_path in order; received_size is the offset the next chunk must
+    start at. The Contract is created once the last chunk arrives.
+    """
+
+    file_name = models.CharField(max_length=255)
+    total_size = models.BigIntegerField()
+    received_size = models.BigIntegerField(default=0)
+    content_type = models.CharField(max_length=100, blank=True)
+    temp_path = models.CharField(max_length=512)
+    status = models.CharField(
+        max_length=50, choices=UPLOAD_STATUS, default=UPLOAD_IN_PROGRESS
+    )
+    # Set while a request writes a chunk; claims the offset without a lock
+    writing_since = models.DateTimeField(null=True, blank=True)
+    contract = models.OneToOneField(
+        Contract,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="upload",
+    )
+
+
+# Topic of clauses that match no CHECKLIST category
+CLAUSE_TOPIC_EXTRA = "extra"
+
+
+class ContractClause(BaseModel):
+    """One analysed clause of a contract report, in document order."""
+
+    contract = models.ForeignKey(
+        Contract, on_delete=models.CASCADE, related_name="clauses"
+    )
+    position = models.PositiveIntegerField()
+    topic = models.CharField(max_length=255)
+    content = models.TextField()
+    summary = models.TextField(blank=True)
+    vague = models.BooleanField(default=False)
+    red_flag = models.BooleanField(default=False)
+    issue_reason = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["position"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["contract", "position"], name="clause_contract_position_uniq"
+            ),
+        ]
+        indexes = [
+            # Cross-contract queries, e.g. red flags on a topic this month
+            models.Index(
+                fields=["topic", "red_flag", "created_at"], name="clause_topic_risk_idx"
+            ),
+            # Risk view of one contract
+            models.Index(
+                fields=["contract", "position"],
+                name="clause_contract_risk_idx",
+                condition=models.Q(red_flag=True) | models.Q(vague=True),
+            ),
+        ]
+
+
+class ClauseQuestion(BaseModel):
+    """A question to ask the company about a clause."""
+
+    clause = models.ForeignKey(
+        ContractClause, on_delete=models.CASCADE, related_name="questions"
+    )
+    position = models.PositiveIntegerField()
+    question = models.TextField()
+
+    class Meta:
+        ordering = ["position"]
+        indexes = [
+            models.Index(fields=["clause", "position"], name="question_clause_idx"),
+        ]
+
+
+class ContractTopicCoverage(BaseModel):
+    """Whether the contract has a clause on a CHECKLIST topic."""
+
+    contract = models.ForeignKey(
+        Contract, on_delete=models.CASCADE, related_name="topic_coverage"
+    )
+    position = models.PositiveIntegerField()
+    topic = models.CharField(max_length=255)
+    covered = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ["position"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["contract", "topic"], name="coverage_contract_topic_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["topic", "covered"], name="coverage_topic_idx"),
+        ]
+
+
+class ContractRiskSummary(BaseModel):
+    """Contract-level figures of a report, precomputed when it is saved."""
+
+    contract = models.OneToOneField(
+        Contract, on_delete=models.CASCADE, related_name="risk_summary"
+    )
+    contract_summary = models.TextField(blank=True)
+    clause_count = models.PositiveIntegerField(default=0)
+    red_flag_count = models.PositiveIntegerField(default=0)
+    vague_count = models.PositiveIntegerField(default=0)
+    question_count = models.PositiveIntegerField(default=0)
+    covered_count = models.PositiveIntegerField(default=0)
+    uncovered_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["red_flag_count"], name="risk_red_flag_count_idx"),
+        ]
+
+
+class ContractArtifact(BaseModel):
+    """
+    Precomputed, compressed payload of a contract (e.g. its report JSON),
+    stored once per encoding so it can be served without re-encoding.
+    etag identifies the uncompressed content and is shared by encodings.
+    """
+
+    contract = models.ForeignKey(
+        Contract, on_delete=models.CASCADE, related_name="artifacts"
+    )
+    kind = models.CharField(max_length=50, choices=ARTIFACT_KINDS)
+    encoding = models.CharField(max_length=20)
+    etag = models.CharField(max_length=100)
+    size = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["contract", "kind", "encoding"],
+                name="artifact_contract_kind_encoding_uniq",
+            ),
+        ]
+
+
+class VectorCollectionAlias(BaseModel):
+    """
+    Stable name of a Chroma collection that is rebuilt under versioned
+    names. Readers resolve the alias on each lookup, so pointing it at a
+    completely built version swaps the index in atomically.
+    """
+
+    alias = models.CharField(max_length=100, unique=True)
+    collection_name = models.CharField(max_length=255)
+    chunk_count = models.PositiveIntegerField(default=0)
@@ -1,6 +1,19 @@
+import hashlib
 import re
+import time
+from typing import Iterable
+
+from chromadb.errors import NotFoundError
+from django.db import transaction
 
 from core.ai.chroma import chroma, openai_ef
+from core.ai.ingestion import ingest_chunks
+
+from .models import VectorCollectionAlias
+
+UU_REFERENCE_COLLECTION = "uu_reference"
+# Rows read from Chroma per request when diffing or copying a collection
+COLLECTION_PAGE_SIZE = 500
 
 BAB_ROMAN_PATTERN = re.compile(r"^#\s*BAB\s+([IVXLCDM]+)", re.IGNORECASE)
 BAB_TITLE_PATTERN = re.compile(r"^##\s*(.+)", re.IGNORECASE)
@@ -8,168 +21,198 @@ PASAL_PATTERN = re.compile(r"^###\s*Pasal\s+(\d+)", re.IGNORECASE)
 BAGIAN_PATTERN = re.compile(r"^###\s*Bagian\s+(.+)$", re.IGNORECASE)
 PARAGRAF_PATTERN = re.compile(r"^####\s*Paragraf\s+(\d+)", re.IGNORECASE)
 
+UU_13_2003_TITLE = (
+    "UNDANG-UNDANG REPUBLIK INDONESIA NOMOR 13 TAHUN 2003 TENTANG KETENAGAKERJAAN"
+)
 
-def parse_uu_document(markdown_text: str):
+
+class ParsePatterns:
     """
-    Parses the full Undang-Undang text into a list of Pasal chunks,
-    with hierarchical metadata (BAB, Bagian, Paragraf).
-    Each chunk represents a complete Pasal.
+    Heading patterns of a regulation's Markdown layout; each captures the
+    heading's number or title in group 1. Defaults match the UU 13/2003
+    conversion (# BAB, ## title, ### Bagian / Pasal, #### Paragraf).
+
+    Amending laws set `amendment` to the heading of their own Pasal; the
+    `pasal` headings below it are the amended Pasal, whose chunks record
+    the amending Pasal as "pasal_pengubah".
     """
-    pasal_chunks = []
-    current_bab_romawi = None
-    current_bab_judul = None
-    current_bagian_judul = None
-    current_paragraf_nomor = None
-
-    current_pasal_number = None
-    current_pasal_lines = []
-
-    lines = markdown_text.splitlines()
-    i = 0
-    while i < len(lines):
-        line = lines[
-            i
-        ].strip()  # 'line' now holds the stripped content for this iteration
-
-        # Try to match BAB Roman numeral (e.g., # BAB I)
-        if bab_roman_match := BAB_ROMAN_PATTERN.match(line):
-            # If we were building a Pasal, finalize it
-            if current_pasal_number is not None and current_pasal_lines:
-                pasal_chunks.append(
-                    {
-                        "bab_romawi": current_bab_romawi,
-                        "bab_judul": current_bab_judul,
-                        "bagian_judul": current_bagian_judul,
-                        "paragraf_nomor": current_paragraf_nomor,
-                        "pasal_number": current_pasal_number,
-                        "content": "\n".join(current_pasal_lines).strip(),
-                    }
-                )
-                current_pasal_lines = []
-                current_pasal_number = None
-
-            current_bab_romawi = bab_roman_match.group(1)
-
-            # Check the next line for the BAB title (e.g., ## KETENTUAN UMUM)
-            if i + 1 < len(lines):
-                next_line = lines[i + 1].strip()
-                if bab_title_match := BAB_TITLE_PATTERN.match(next_line):
-                    current_bab_judul = bab_title_match.group(1).strip()
-                    i += 1  # Consume the title line
-                else:
-                    current_bab_judul = None  # No title found on next line
-
-            # Reset Bagian and Paragraf when a new BAB starts
-            current_bagian_judul = None
-            current_paragraf_nomor = None
-
-        # Check for Bagian heading (e.g., ### Bagian Kesatu)
-        elif bagian_match := BAGIAN_PATTERN.match(line):
-            # Flush current Pasal if any, before updating Bagian context
-            if current_pasal_number is not None and current_pasal_lines:
-                pasal_chunks.append(
-                    {
-                        "bab_romawi": current_bab_romawi,
-                        "bab_judul": current_bab_judul,
-                        "bagian_judul": current_bagian_judul,
-                        "paragraf_nomor": current_paragraf_nomor,
-                        "pasal_number": current_pasal_number,
-                        "content": "\n".join(current_pasal_lines).strip(),
-                    }
-                )
-                current_pasal_lines = []
-                current_pasal_number = None
-
-            current_bagian_judul = bagian_match.group(1).strip()
-            # Reset Paragraf when a new Bagian starts
-            current_paragraf_nomor = None
-
-        # Check for Paragraf heading (e.g., #### Paragraf 1)
-        elif paragraf_match := PARAGRAF_PATTERN.match(line):
-            # Flush current Pasal if any, before updating Paragraf context
-            if current_pasal_number is not None and current_pasal_lines:
-                pasal_chunks.append(
-                    {
-                        "bab_romawi": current_bab_romawi,
-                        "bab_judul": current_bab_judul,
-                        "bagian_judul": current_bagian_judul,
-                        "paragraf_nomor": current_paragraf_nomor,
-                        "pasal_number": current_pasal_number,
-                        "content": "\n".join(current_pasal_lines).strip(),
-                    }
-                )
-                current_pasal_lines = []
-                current_pasal_number = None
-
-            current_paragraf_nomor = paragraf_match.group(1).strip()
-
-        # Check for Pasal heading (e.g., ### Pasal 1)
-        elif pasal_match := PASAL_PATTERN.match(line):
-            # If there's an existing Pasal being built, finalize it first
-            if current_pasal_number is not None and current_pasal_lines:
-                pasal_chunks.append(
-                    {
-                        "bab_romawi": current_bab_romawi,
-                        "bab_judul": current_bab_judul,
-                        "bagian_judul": current_bagian_judul,
-                        "paragraf_nomor": current_paragraf_nomor,
-                        "pasal_number": current_pasal_number,
-                        "content": "\n".join(current_pasal_lines).strip(),
-                    }
+
+    def __init__(
+        self,
+        bab_roman=BAB_ROMAN_PATTERN,
+        bab_title=BAB_TITLE_PATTERN,
+        pasal=PASAL_PATTERN,
+        bagian=BAGIAN_PATTERN,
+        paragraf=PARAGRAF_PATTERN,
+        amendment=None,
+    ):
+        self.bab_roman = bab_roman
+        self.bab_title = bab_title
+        self.pasal = pasal
+        self.bagian = bagian
+        self.paragraf = paragraf
+        self.amendment = amendment
+        # One alternation tried once per line, in the precedence BAB,
+        # Bagian, Paragraf, amending Pasal, Pasal; the matching
+        # alternative's name is the heading kind and its first inner group
+        # the captured value
+        self.heading = re.compile(
+            "|".join(
+                f"(?P<{kind}>{_scoped(pattern)})"
+                for kind, pattern in (
+                    ("bab", bab_roman),
+                    ("bagian", bagian),
+                    ("paragraf", paragraf),
+                    ("amendment", amendment),
+                    ("pasal", pasal),
                 )
-            # Start a new Pasal. The Pasal heading itself is part of the content.
-            current_pasal_number = pasal_match.group(1)
-            current_pasal_lines = [line]  # Include the Pasal line itself in content
+                if pattern is not None
+            )
+        )
+
+
+def _scoped(pattern: re.Pattern) -> str:
+    """Pattern source keeping its own case-insensitivity inside an alternation."""
+    if pattern.flags & re.IGNORECASE:
+        return f"(?i:{pattern.pattern})"
+    return pattern.pattern
+
 
+UU_PATTERNS = ParsePatterns()
+
+
+def _pasal_chunk(context: dict, pasal_number: str, lines: list[str]) -> dict:
+    return {
+        **context,
+        "pasal_number": pasal_number,
+        "content": "\n".join(lines).strip(),
+    }
+
+
+def iter_uu_document(lines: Iterable[str], patterns: ParsePatterns = UU_PATTERNS):
+    """
+    Streams Pasal chunks with hierarchical metadata (BAB, Bagian,
+    Paragraf) from the lines of an Undang-Undang, e.g. an open file. Each
+    chunk is yielded as soon as the next heading ends it, so memory does
+    not grow with the document. Runs of blank lines are collapsed to one.
+    """
+    context = {
+        "bab_romawi": None,
+        "bab_judul": None,
+        "bagian_judul": None,
+        "paragraf_nomor": None,
+        "pasal_pengubah": None,
+    }
+    amending_number = None
+    pasal_number = None
+    pasal_lines: list[str] = []
+    expect_bab_title = False
+    previous_blank = False
+
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line:
+            if previous_blank:
+                continue
+            previous_blank = True
         else:
+            previous_blank = False
+        line = line.strip()
+
+        # A BAB heading may be followed by its title (e.g. ## KETENTUAN UMUM)
+        if expect_bab_title:
+            expect_bab_title = False
+            if bab_title_match := patterns.bab_title.match(line):
+                context["bab_judul"] = bab_title_match.group(1).strip()
+                continue
+            context["bab_judul"] = None
+
+        heading = patterns.heading.match(line)
+        if heading is None:
             # Regular content line, add to current Pasal
-            if current_pasal_number is not None:
-                current_pasal_lines.append(line)
-
-        i += 1  # Move to the next line
-
-    # Add the very last Pasal chunk after the loop finishes
-    if current_pasal_number is not None and current_pasal_lines:
-        pasal_chunks.append(
-            {
-                "bab_romawi": current_bab_romawi,
-                "bab_judul": current_bab_judul,
-                "bagian_judul": current_bagian_judul,
-                "paragraf_nomor": current_paragraf_nomor,
-                "pasal_number": current_pasal_number,
-                "content": "\n".join(current_pasal_lines).strip(),
-            }
-        )
+            if pasal_number is not None:
+                pasal_lines.append(line)
+            continue
 
-    return pasal_chunks
+        # Any heading ends the Pasal being built
+        if pasal_number is not None and pasal_lines:
+            yield _pasal_chunk(context, pasal_number, pasal_lines)
+        pasal_number = None
+        pasal_lines = []
+
+        kind = heading.lastgroup
+        value = heading.group(heading.lastindex + 1)
+        if kind == "bab":
+            context["bab_romawi"] = value
+            # Bagian and Paragraf restart with every BAB
+            context["bagian_judul"] = None
+            context["paragraf_nomor"] = None
+            amending_number = None
+            expect_bab_title = True
+        elif kind == "bagian":
+            context["bagian_judul"] = value.strip()
+            context["paragraf_nomor"] = None
+        elif kind == "paragraf":
+            context["paragraf_nomor"] = value.strip()
+        else:
+            # The Pasal heading itself is part of the content. An amending
+            # Pasal is a chunk of its own (its introductory text) and the
+            # parent of the amended Pasal that follow it.
+            if kind == "amendment":
+                amending_number = value
+                context["pasal_pengubah"] = None
+            else:
+                context["pasal_pengubah"] = amending_number
+            pasal_number = value
+            pasal_lines = [line]
 
+    if pasal_number is not None and pasal_lines:
+        yield _pasal_chunk(context, pasal_number, pasal_lines)
 
-def build_uu_reference_vector_collection(
-    input_file_path: str, collection_name: str = "uu_reference"
-) -> None:
+
+def iter_uu_file(file_path: str, patterns: ParsePatterns = UU_PATTERNS):
+    with open(file_path, "r", encoding="utf-8") as f:
+        yield from iter_uu_document(f, patterns)
+
+
+def parse_uu_document(markdown_text: str, patterns: ParsePatterns = UU_PATTERNS):
     """
-    Read a UU file (Markdown or PDF), convert to cleaned Markdown,
-    split into deterministic Pasal chunks annotated by BAB, Bagian, and Paragraf,
-    and ingest into a Chroma collection with embeddings.
+    Parses the full Undang-Undang text into a list of Pasal chunks,
+    with hierarchical metadata (BAB, Bagian, Paragraf).
+    Each chunk represents a complete Pasal.
     """
-    print(f"Loading content from {input_file_path} for processing...")
-    with open(input_file_path, "r", encoding="utf-8") as f:
-        raw_markdown = f.read()
+    return list(iter_uu_document(markdown_text.splitlines(), patterns))
+
+
+def chunk_hash(content: str, metadata: dict) -> str:
+    """Identifies a chunk's text and metadata; equal hashes need no re-embedding."""
+    digest = hashlib.sha256(content.encode("utf-8"))
+    for key, value in sorted(metadata.items()):
+        if key != "content_hash":
+            digest.update(f"\0{key}={value}".encode("utf-8"))
+    return digest.hexdigest()[:32]
 
-    cleaned_markdown = re.sub(
-        r"\n{3,}", "\n\n", raw_markdown
-    )  # replace multilines with two lines
-    pasal_chunks = parse_uu_document(cleaned_markdown)
 
-    chunk_ids: list[str] = []
-    chunk_texts: list[str] = []
-    chunk_metadatas: list[dict] = []
+def iter_uu_reference_chunks(
+    input_file_path: str,
+    collection_name: str = UU_REFERENCE_COLLECTION,
+    title: str = UU_13_2003_TITLE,
+    patterns: ParsePatterns = UU_PATTERNS,
+):
+    """
+    Streams a UU Markdown file as deterministic Pasal chunks annotated by
+    BAB, Bagian, and Paragraf, yielding (id, text, metadata) one at a time.
+    """
+    pasal_chunks = iter_uu_file(input_file_path, patterns)
+    # Occurrences per id; amending laws may repeat a Pasal number in one BAB
+    id_counts: dict[str, int] = {}
 
     for idx, pasal_chunk in enumerate(pasal_chunks):
         bab_romawi = pasal_chunk.get("bab_romawi")
         bab_judul = pasal_chunk.get("bab_judul")
         bagian_judul = pasal_chunk.get("bagian_judul")
         paragraf_nomor = pasal_chunk.get("paragraf_nomor")
+        pasal_pengubah = pasal_chunk.get("pasal_pengubah")
         pasal_number = pasal_chunk.get("pasal_number")
         content = pasal_chunk.get("content")
 
@@ -178,15 +221,24 @@ def build_uu_reference_vector_collection(
 
         cid = "_".join(
             part
-            for part in [collection_name, f"BAB{bab_romawi}", f"PASAL{pasal_number}"]
+            for part in [
+                collection_name,
+                f"BAB{bab_romawi}" if bab_romawi else None,
+                f"PASAL{pasal_pengubah}" if pasal_pengubah else None,
+                f"PASAL{pasal_number}",
+            ]
             if part
         )
+        id_counts[cid] = id_counts.get(cid, 0) + 1
+        if id_counts[cid] > 1:
+            cid = f"{cid}_{id_counts[cid]}"
 
         # Build the metadata dictionary
         meta = {
-            "undang_undang_title": "UNDANG-UNDANG REPUBLIK INDONESIA NOMOR 13 TAHUN 2003 TENTANG KETENAGAKERJAAN",
+            "undang_undang_title": title,
             "bab_romawi": bab_romawi,
             "bab_judul": bab_judul,
+            "pasal_pengubah": pasal_pengubah,
             "pasal_number": pasal_number,
         }
 
@@ -209,7 +261,7 @@ def build_uu_reference_vector_collection(
                 del meta["paragraf_nomor"]
 
         # Handle cross_references: convert list to string or remove if empty
-        cross_references = re.findall(r"Pasal\s+(\d+)", content)
+        cross_references = re.findall(r"Pasal\s+(\d+[A-Z]?)\b", content)
         if cross_references:
             # Sort unique references and join into a single string
             meta["cross_references"] = ",".join(sorted(list(set(cross_references))))
@@ -219,72 +271,228 @@ def build_uu_reference_vector_collection(
             pass  # No cross_references key added if the list is empty
 
         # For other metadata values that are strings, apply cleaning as well
-        for key in ["undang_undang_title", "bab_romawi", "bab_judul", "pasal_number"]:
+        for key in [
+            "undang_undang_title",
+            "bab_romawi",
+            "bab_judul",
+            "pasal_pengubah",
+            "pasal_number",
+        ]:
             if key in meta and isinstance(meta[key], str):
                 cleaned_value = meta[key].encode("ascii", "ignore").decode("ascii")
                 cleaned_value = re.sub(r"[\x00-\x1f\x7f-\x9f]", "", cleaned_value)
                 meta[key] = cleaned_value.strip()
 
+        # Regulations without BAB headings; Chroma rejects None values
+        meta = {key: value for key, value in meta.items() if value is not None}
+        meta["content_hash"] = chunk_hash(content, meta)
+
+        yield cid, content, meta
+
+
+def build_uu_reference_chunks(
+    input_file_path: str,
+    collection_name: str = UU_REFERENCE_COLLECTION,
+    title: str = UU_13_2003_TITLE,
+    patterns: ParsePatterns = UU_PATTERNS,
+) -> tuple[list[str], list[str], list[dict]]:
+    """All chunks of iter_uu_reference_chunks as (ids, texts, metadatas)."""
+    chunks = iter_uu_reference_chunks(input_file_path, collection_name, title, patterns)
+    chunk_ids, chunk_texts, chunk_metadatas = [], [], []
+    for cid, content, meta in chunks:
         chunk_ids.append(cid)
         chunk_texts.append(content)
         chunk_metadatas.append(meta)
+    return chunk_ids, chunk_texts, chunk_metadatas
 
-    if not chunk_ids:
-        print(f"⚠️ No chunks extracted from '{input_file_path}'. Check parsing logic.")
-        return
 
+def versioned_collection_name(alias: str) -> str:
+    return f"{alias}__v{time.time_ns()}"
+
+
+def resolve_collection_name(alias: str) -> str:
+    """
+    Collection an alias currently points to. Collections built before
+    aliases existed carry the alias as their own name.
+    """
+    name = (
+        VectorCollectionAlias.objects.filter(alias=alias)
+        .values_list("collection_name", flat=True)
+        .first()
+    )
+    return name or alias
+
+
+@transaction.atomic
+def swap_collection_alias(alias: str, collection_name: str, chunk_count: int) -> str:
+    """Points the alias at a new collection; returns the one it replaced."""
+    current = (
+        VectorCollectionAlias.objects.select_for_update().filter(alias=alias).first()
+    )
+    previous = current.collection_name if current else alias
+    VectorCollectionAlias.objects.update_or_create(
+        alias=alias,
+        defaults={"collection_name": collection_name, "chunk_count": chunk_count},
+    )
+    return previous
+
+
+def _get_collection(name: str):
     try:
-        chroma.delete_collection(name=collection_name)
-        print(f"🗑️ Existing collection '{collection_name}' deleted.")
-    except Exception as e:
-        print(
-            f"⚠️ Could not delete collection '{collection_name}' (maybe it doesn't exist): {e}"
+        return chroma.get_collection(name=name, embedding_function=openai_ef)
+    except NotFoundError:
+        return None
+
+
+def _read_chunk_hashes(collection) -> dict[str, str | None]:
+    hashes = {}
+    offset = 0
+    while True:
+        page = collection.get(
+            include=["metadatas"], limit=COLLECTION_PAGE_SIZE, offset=offset
+        )
+        for cid, meta in zip(page["ids"], page["metadatas"]):
+            hashes[cid] = (meta or {}).get("content_hash")
+        if len(page["ids"]) < COLLECTION_PAGE_SIZE:
+            return hashes
+        offset += COLLECTION_PAGE_SIZE
+
+
+def _copy_chunks(source, target, ids: list[str]) -> None:
+    """Copies chunks together with their stored embeddings."""
+    for start in range(0, len(ids), COLLECTION_PAGE_SIZE):
+        page = source.get(
+            ids=ids[start : start + COLLECTION_PAGE_SIZE],
+            include=["embeddings", "documents", "metadatas"],
+        )
+        target.add(
+            ids=page["ids"],
+            embeddings=page["embeddings"],
+            documents=page["documents"],
+            metadatas=page["metadatas"],
         )
 
-    collection = chroma.create_collection(
-        name=collection_name, embedding_function=openai_ef
-    )
-    print(f"✨ Collection '{collection_name}' re-created.")
 
-    print(f"➕ Adding {len(chunk_ids)} chunks to '{collection_name}'...")
-    collection.add(ids=chunk_ids, documents=chunk_texts, metadatas=chunk_metadatas)
+def _prune_collection_versions(alias: str, keep: set[str]) -> None:
+    """Deletes superseded versions, keeping the live and the previous one."""
+    for collection in chroma.list_collections():
+        name = collection.name
+        if name in keep or not (name == alias or name.startswith(f"{alias}__v")):
+            continue
+        try:
+            chroma.delete_collection(name=name)
+            print(f"🗑️ Old collection version '{name}' deleted.")
+        except Exception as e:
+            print(f"⚠️ Could not delete collection '{name}': {e}")
 
-    print(f"✅ Collection '{collection_name}' created with {len(chunk_ids)} chunks.")
-    print(f"Counted {collection.count()} chunks in the collection.")
+
+def build_uu_reference_vector_collection(
+    input_file_path: str,
+    collection_name: str = UU_REFERENCE_COLLECTION,
+    force_recreate: bool = False,
+    title: str = UU_13_2003_TITLE,
+    patterns: ParsePatterns = UU_PATTERNS,
+):
+    """
+    Indexes the UU file under the `collection_name` alias, incrementally.
+
+    Each chunk carries a hash of its content and metadata. Chunks whose
+    hash matches the live version are copied into the new version with
+    their stored embeddings; only new or changed chunks are embedded, and
+    removed ones are left out. The new version is built under a versioned
+    name and the alias is switched to it once complete, so chat keeps
+    using the previous version meanwhile. Nothing is rebuilt if no chunk
+    changed. force_recreate embeds every chunk again. `title` and
+    `patterns` describe the regulation (see documents.corpus).
+
+    The file is streamed twice: once to diff chunk hashes against the live
+    version and once to feed the changed chunks to the embedding pipeline,
+    so only ids and hashes, not chunk texts, are held in memory.
+
+    Returns the live collection.
+    """
+
+    def chunks():
+        return iter_uu_reference_chunks(
+            input_file_path, collection_name, title, patterns
+        )
+
+    print(f"Loading content from {input_file_path} for processing...")
+    hashes = {cid: meta["content_hash"] for cid, _, meta in chunks()}
+    if not hashes:
+        print(f"⚠️ No chunks extracted from '{input_file_path}'. Check parsing logic.")
+        return None
+
+    current = None
+    if not force_recreate:
+        current = _get_collection(resolve_collection_name(collection_name))
+    existing = _read_chunk_hashes(current) if current is not None else {}
+
+    unchanged = [cid for cid, digest in hashes.items() if existing.get(cid) == digest]
+    changed = {cid for cid, digest in hashes.items() if existing.get(cid) != digest}
+    removed = existing.keys() - hashes.keys()
+    if current is not None and not changed and not removed:
+        print(f"✅ Collection '{collection_name}' is up to date ({current.name}).")
+        return current
+
+    print(
+        f"🔄 '{collection_name}': {len(changed)} new or changed, "
+        f"{len(removed)} removed, {len(unchanged)} unchanged chunks."
+    )
+    new_name = versioned_collection_name(collection_name)
+    collection = chroma.create_collection(
+        name=new_name,
+        embedding_function=openai_ef,
+        metadata={"alias": collection_name},
+    )
+    try:
+        if unchanged:
+            _copy_chunks(current, collection, unchanged)
+        if changed:
+            print(f"➕ Embedding {len(changed)} chunks into '{new_name}'...")
+            ingest_chunks(
+                collection,
+                (chunk for chunk in chunks() if chunk[0] in changed),
+                progress=lambda done, total: print(f"   {done}/{total} embedded"),
+                total=len(changed),
+            )
+    except Exception:
+        chroma.delete_collection(name=new_name)
+        raise
+
+    count = collection.count()
+    previous = swap_collection_alias(collection_name, new_name, count)
+    print(
+        f"✅ Collection '{collection_name}' now points to '{new_name}' ({count} chunks)."
+    )
+    _prune_collection_versions(collection_name, keep={new_name, previous})
+    return collection
 
 
 def ensure_uu_reference_collection(
     file_path: str = "media/uu_13_2003_gemini.md",
-    collection_name: str = "uu_reference",
+    collection_name: str = UU_REFERENCE_COLLECTION,
     force_recreate: bool = False,
+    title: str = UU_13_2003_TITLE,
+    patterns: ParsePatterns = UU_PATTERNS,
 ):
     """
-    Checks if the 'uu_reference' Chroma collection exists. If not, it builds it.
-    If force_recreate is True, it will rebuild the collection regardless of its existence.
+    Returns the live collection behind the 'uu_reference' alias, building
+    it if it does not exist. force_recreate rebuilds it from scratch;
+    either way the previous version keeps serving until the swap. Errors
+    other than a missing collection are raised rather than triggering a
+    rebuild.
     """
     if force_recreate:
         print(f"Force recreating collection '{collection_name}'...")
-        build_uu_reference_vector_collection(file_path, collection_name)
+        return build_uu_reference_vector_collection(
+            file_path, collection_name, True, title, patterns
+        )
 
-        collection = chroma.get_collection(
-            name=collection_name, embedding_function=openai_ef
+    collection = _get_collection(resolve_collection_name(collection_name))
+    if collection is None:
+        print(f"Collection '{collection_name}' not found. Building it now...")
+        return build_uu_reference_vector_collection(
+            file_path, collection_name, title=title, patterns=patterns
         )
-        return collection
-    else:
-        try:
-            collection = chroma.get_collection(
-                name=collection_name, embedding_function=openai_ef
-            )
-            print(
-                f"🎉 Collection '{collection_name}' found. It contains {collection.count()} items."
-            )
-            return collection
-        except Exception as e:
-            print(
-                f"Collection '{collection_name}' not found or an error occurred: {e}. Building it now..."
-            )
-            build_uu_reference_vector_collection(file_path, collection_name)
-            collection = chroma.get_collection(
-                name=collection_name, embedding_function=openai_ef
-            )
-            return collection
\ No newline at end of file
+    return collection
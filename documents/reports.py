@@ -0,0 +1,137 @@
+from django.db import transaction
+from django.db.models import Q
+
+from .models import (
+    ClauseQuestion,
+    Contract,
+    ContractClause,
+    ContractRiskSummary,
+    ContractTopicCoverage,
+)
+
+REPORT_VIEW_FULL = "full"
+REPORT_VIEW_SUMMARY = "summary"
+REPORT_VIEW_TOPICS = "topics"
+REPORT_VIEW_CLAUSES = "clauses"
+REPORT_VIEW_RISKS = "risks"
+
+REPORT_VIEWS = (
+    REPORT_VIEW_FULL,
+    REPORT_VIEW_SUMMARY,
+    REPORT_VIEW_TOPICS,
+    REPORT_VIEW_CLAUSES,
+    REPORT_VIEW_RISKS,
+)
+
+
+@transaction.atomic
+def save_report(contract: Contract, report: dict) -> ContractRiskSummary:
+    """
+    Stores a report produced by process_contract in the normalized report
+    tables, replacing the previous report of the contract.
+    """
+    ContractClause.objects.filter(contract=contract).delete()
+    ContractTopicCoverage.objects.filter(contract=contract).delete()
+    ContractRiskSummary.objects.filter(contract=contract).delete()
+
+    clauses = ContractClause.objects.bulk_create(
+        ContractClause(
+            contract=contract,
+            user_id=contract.user_id,
+            position=position,
+            topic=clause.get("clauseTopic") or "",
+            content=clause.get("clauseContent") or "",
+            summary=clause.get("clauseSummary") or "",
+            vague=bool(clause.get("vague")),
+            red_flag=bool(clause.get("redFlag")),
+            issue_reason=clause.get("issueReason") or "",
+        )
+        for position, clause in enumerate(report.get("clauses", []))
+    )
+    questions = ClauseQuestion.objects.bulk_create(
+        ClauseQuestion(
+            clause=clause,
+            user_id=contract.user_id,
+            position=position,
+            question=question,
+        )
+        for clause, data in zip(clauses, report.get("clauses", []))
+        for position, question in enumerate(data.get("questions") or [])
+    )
+
+    covered = report.get("coveredTopic", [])
+    uncovered = report.get("uncoveredTopic", [])
+    ContractTopicCoverage.objects.bulk_create(
+        ContractTopicCoverage(
+            contract=contract,
+            user_id=contract.user_id,
+            position=position,
+            topic=topic,
+            covered=position < len(covered),
+        )
+        for position, topic in enumerate(covered + uncovered)
+    )
+
+    return ContractRiskSummary.objects.create(
+        contract=contract,
+        user_id=contract.user_id,
+        contract_summary=report.get("contractSummary") or "",
+        clause_count=len(clauses),
+        red_flag_count=sum(clause.red_flag for clause in clauses),
+        vague_count=sum(clause.vague for clause in clauses),
+        question_count=len(questions),
+        covered_count=len(covered),
+        uncovered_count=len(uncovered),
+    )
+
+
+def _clause_entry(clause: ContractClause) -> dict:
+    return {
+        "clauseTopic": clause.topic,
+        "clauseContent": clause.content,
+        "clauseSummary": clause.summary,
+        "vague": clause.vague,
+        "redFlag": clause.red_flag,
+        "issueReason": clause.issue_reason,
+        "questions": [question.question for question in clause.questions.all()],
+    }
+
+
+def build_report(contract: Contract, view: str = REPORT_VIEW_FULL) -> dict | None:
+    """
+    Assembles a report from the report tables in the shape process_contract
+    produces, or only the part named by `view`, querying just the tables
+    that part needs. Returns None when no report has been stored.
+    """
+    try:
+        summary = ContractRiskSummary.objects.get(contract=contract)
+    except ContractRiskSummary.DoesNotExist:
+        return None
+
+    report = {"fileName": contract.file_path.name}
+
+    if view in (REPORT_VIEW_FULL, REPORT_VIEW_SUMMARY):
+        report["contractSummary"] = summary.contract_summary
+        report["riskSummary"] = {
+            "clauseCount": summary.clause_count,
+            "redFlagCount": summary.red_flag_count,
+            "vagueCount": summary.vague_count,
+            "questionCount": summary.question_count,
+            "coveredCount": summary.covered_count,
+            "uncoveredCount": summary.uncovered_count,
+        }
+
+    if view in (REPORT_VIEW_FULL, REPORT_VIEW_SUMMARY, REPORT_VIEW_TOPICS):
+        coverage = list(ContractTopicCoverage.objects.filter(contract=contract))
+        report["coveredTopic"] = [row.topic for row in coverage if row.covered]
+        report["uncoveredTopic"] = [row.topic for row in coverage if not row.covered]
+
+    if view in (REPORT_VIEW_FULL, REPORT_VIEW_CLAUSES, REPORT_VIEW_RISKS):
+        clauses = ContractClause.objects.filter(contract=contract)
+        if view == REPORT_VIEW_RISKS:
+            clauses = clauses.filter(Q(red_flag=True) | Q(vague=True))
+        report["clauses"] = [
+            _clause_entry(clause) for clause in clauses.prefetch_related("questions")
+        ]
+
+    return report
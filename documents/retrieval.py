@@ -0,0 +1,263 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+# Amending laws insert Pasal with a letter suffix, e.g. Pasal 61A
+PASAL_REFERENCE_PATTERN = re.compile(r"\bpasal\s+(\d+)([a-z]?)\b", re.IGNORECASE)
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough heuristic (~4 characters per token) that is good enough for budgeting
+    return len(text) // 4 + 1
+
+
+def extract_pasal_numbers(text: str) -> list[str]:
+    """
+    Returns the Pasal numbers explicitly mentioned in a question
+    (e.g. "apa isi Pasal 59?"), in order of appearance and without duplicates.
+    """
+    numbers = []
+    for digits, suffix in PASAL_REFERENCE_PATTERN.findall(text):
+        number = f"{int(digits)}{suffix.upper()}"
+        if number not in numbers:
+            numbers.append(number)
+    return numbers
+
+
+def pasal_sort_key(number: str) -> tuple[float, str]:
+    """Numeric order for Pasal numbers: 2 < 10 < 61 < 61A < 62."""
+    digits = number.rstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+    return int(digits) if digits.isdigit() else math.inf, number[len(digits) :]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed list of documents, backed by an inverted index
+    of term -> [(document position, term frequency)].
+    """
+
+    def __init__(self, documents: list[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: list[int] = []
+
+        for position, document in enumerate(documents):
+            tokens = tokenize(document)
+            self.doc_lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                self.postings[term].append((position, frequency))
+
+        doc_count = len(self.doc_lengths)
+        self.avg_doc_length = sum(self.doc_lengths) / doc_count if doc_count else 0.0
+        self.idf = {
+            term: math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query: str, n_results: int = 10) -> list[tuple[int, float]]:
+        scores: dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for position, frequency in self.postings[term]:
+                norm = (
+                    1
+                    - self.b
+                    + self.b * self.doc_lengths[position] / self.avg_doc_length
+                )
+                scores[position] += (
+                    idf * frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+                )
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:n_results]
+
+
+class HybridRetriever:
+    """
+    Retrieves Pasal chunks from a UU reference collection by fusing BM25
+    lexical ranks with Chroma vector ranks (reciprocal rank fusion).
+    Questions that name a Pasal explicitly are answered from a direct
+    pasal_number index without calling the embedding model.
+
+    A cross-reference adjacency graph (Pasal -> Pasal it cites) is built
+    alongside the other indexes so top hits can be expanded by one hop.
+    """
+
+    def __init__(self, collection, rrf_k: int = 60):
+        self.collection = collection
+        self.rrf_k = rrf_k
+
+        records = collection.get(include=["documents", "metadatas"])
+        self.ids: list[str] = records["ids"]
+        self.documents: list[str] = records["documents"]
+        self.metadatas: list[dict] = records["metadatas"]
+
+        self.positions = {cid: position for position, cid in enumerate(self.ids)}
+        self.pasal_index = self._build_pasal_index()
+        self.bm25 = BM25Index(self.documents)
+        self.reference_graph = self._build_reference_graph()
+
+    def _build_pasal_index(self) -> dict[str, int]:
+        """
+        Pasal number -> chunk position. Amending laws repeat numbers: the
+        Pasal they amend are preferred over their own, earliest amending
+        Pasal first (e.g. UU 6/2023 Pasal 81, which amends UU 13/2003).
+        """
+        candidates = defaultdict(list)
+        for position, meta in enumerate(self.metadatas):
+            if meta and meta.get("pasal_number"):
+                amending = meta.get("pasal_pengubah")
+                # Numeric order for numbers with an optional letter suffix
+                rank = (0, len(amending), amending) if amending else (1, 0, "")
+                candidates[str(meta["pasal_number"])].append((rank, position))
+        return {number: min(ranked)[1] for number, ranked in candidates.items()}
+
+    def _build_reference_graph(self) -> dict[str, list[str]]:
+        graph = {}
+        for number, position in self.pasal_index.items():
+            references = self.metadatas[position].get("cross_references") or ""
+            graph[number] = sorted(
+                (
+                    ref
+                    for ref in references.split(",")
+                    if ref and ref != number and ref in self.pasal_index
+                ),
+                key=pasal_sort_key,
+            )
+        return graph
+
+    def _hit(self, position: int, score: float, source: str) -> dict:
+        return {
+            "id": self.ids[position],
+            "document": self.documents[position],
+            "metadata": self.metadatas[position],
+            "score": score,
+            "source": source,
+        }
+
+    def lookup_pasal(self, pasal_numbers: list[str]) -> list[dict]:
+        return [
+            self._hit(self.pasal_index[number], 1.0, "pasal")
+            for number in pasal_numbers
+            if number in self.pasal_index
+        ]
+
+    def expand_references(
+        self,
+        hits: list[dict],
+        token_budget: int = 1500,
+        max_per_hit: int = 3,
+        question: str | None = None,
+    ) -> list[dict]:
+        """
+        Appends the Pasal cited by each hit (one hop, in hit order) until the
+        token budget for the added chunks is spent. Chunks that would overflow
+        the budget are skipped so smaller neighbours can still fit.
+
+        Each hit contributes its `max_per_hit` most relevant citations: by
+        BM25 score against `question` when given, else in Pasal order.
+        """
+        expanded = list(hits)
+        seen = {hit["metadata"].get("pasal_number") for hit in hits}
+        remaining = token_budget
+        scores = dict(self.bm25.search(question, len(self.ids))) if question else {}
+
+        for hit in hits:
+            source_number = hit["metadata"].get("pasal_number")
+            references = self.reference_graph.get(source_number, [])
+            if scores:
+                # Stable sort keeps Pasal order among equally relevant ones
+                references = sorted(
+                    references,
+                    key=lambda number: scores.get(self.pasal_index[number], 0.0),
+                    reverse=True,
+                )
+            for number in references[:max_per_hit]:
+                if number in seen:
+                    continue
+                position = self.pasal_index[number]
+                cost = estimate_tokens(self.documents[position])
+                if cost > remaining:
+                    continue
+                seen.add(number)
+                remaining -= cost
+                neighbour = self._hit(position, hit["score"], "reference")
+                neighbour["referenced_by"] = source_number
+                expanded.append(neighbour)
+
+        return expanded
+
+    def query(
+        self,
+        question: str,
+        n_results: int = 2,
+        candidates: int = 10,
+        query_embedding=None,
+    ) -> list[dict]:
+        """
+        `query_embedding` may be passed when the question's embedding is
+        already known, e.g. when several collections are queried with it.
+        """
+        explicit_hits = self.lookup_pasal(extract_pasal_numbers(question))
+        if explicit_hits:
+            # Direct Pasal references are answered without an embedding call;
+            # any remaining slots are filled from the lexical index only.
+            seen = {hit["id"] for hit in explicit_hits}
+            for position, score in self.bm25.search(question, candidates):
+                if len(explicit_hits) >= n_results:
+                    break
+                if self.ids[position] not in seen:
+                    explicit_hits.append(self._hit(position, score, "lexical"))
+            return explicit_hits
+
+        fused: dict[int, float] = defaultdict(float)
+        for rank, (position, _) in enumerate(self.bm25.search(question, candidates)):
+            fused[position] += 1 / (self.rrf_k + rank + 1)
+
+        if query_embedding is not None:
+            vector_query = {"query_embeddings": [query_embedding]}
+        else:
+            vector_query = {"query_texts": [question]}
+        vector_result = self.collection.query(
+            **vector_query, n_results=candidates, include=["distances"]
+        )
+        for rank, cid in enumerate(vector_result["ids"][0]):
+            if cid in self.positions:
+                fused[self.positions[cid]] += 1 / (self.rrf_k + rank + 1)
+
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)
+        return [
+            self._hit(position, score, "hybrid")
+            for position, score in ranked[:n_results]
+        ]
+
+
+_retrievers: dict[str, HybridRetriever] = {}
+_retrievers_lock = threading.Lock()
+
+
+def get_hybrid_retriever(collection) -> HybridRetriever:
+    """
+    Returns a process-wide HybridRetriever for the given collection, building
+    the lexical and Pasal indexes once. A re-created collection, or a new
+    version swapped in behind the same alias, gets a new id, so its
+    retriever is rebuilt automatically.
+    """
+    key = (collection.metadata or {}).get("alias", collection.name)
+    retriever = _retrievers.get(key)
+    if retriever is None or retriever.collection.id != collection.id:
+        with _retrievers_lock:
+            retriever = _retrievers.get(key)
+            if retriever is None or retriever.collection.id != collection.id:
+                retriever = HybridRetriever(collection)
+                _retrievers[key] = retriever
+    return retriever
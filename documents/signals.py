@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import contract_list_namespace, contract_namespace, invalidate
+
+from .models import Contract
+
+
+@receiver(post_save, sender=Contract)
+@receiver(post_delete, sender=Contract)
+def invalidate_contract_cache(instance, **kwargs):
+    invalidate(
+        contract_namespace(instance.id),
+        contract_list_namespace(),
+        contract_list_namespace(instance.user_id),
+    )
@@ -1,9 +1,21 @@
-from huey.contrib.djhuey import task
+from huey import crontab
+
+from core.queues import CONTRACT_PRIORITY, contract_queue
 
 from .methods import process_contract
 
 
-@task()
+@contract_queue.task(priority=CONTRACT_PRIORITY)
 def process_contract_task(contract_id):
     result_summary = process_contract(contract_id)
     return result_summary
+
+
+@contract_queue.periodic_task(crontab(minute="0"))
+def expire_uploads_task():
+    # uploads enqueues process_contract_task, so it imports this module
+    from .uploads import expire_uploads
+
+    removed = expire_uploads()
+    if removed:
+        print(f"🗑️ Removed {removed} abandoned upload files")
@@ -1,3 +1,358 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import UPLOAD_COMPLETE, Contract, ContractUpload
+from .preparation import build_uu_reference_chunks
+from .retrieval import (
+    BM25Index,
+    HybridRetriever,
+    extract_pasal_numbers,
+    pasal_sort_key,
+)
+from .uploads import expire_uploads
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 4
+
+
+class ContractUploadTests(TestCase):
+    """Resumable chunked uploads: offsets, resuming and checksums."""
+
+    def setUp(self):
+        self.media_root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=self.media_root,
+            CONTRACT_UPLOAD_TEMP_DIR=self.media_root / "uploads",
+            CONTRACT_UPLOAD_CHUNK_SIZE=256,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        patcher = mock.patch("documents.uploads.process_contract_task")
+        self.process_contract_task = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def start(self, size=len(PDF), file_name="contract.pdf"):
+        response = self.client.post(
+            reverse("api_start_contract_upload"),
+            {"file_name": file_name, "size": size},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()["upload_id"]
+
+    def send(self, upload_id, offset, data, checksum=None):
+        headers = {"Upload-Offset": str(offset)}
+        if checksum:
+            headers["Upload-Checksum"] = checksum
+        return self.client.patch(
+            reverse("api_contract_upload_chunk", args=[upload_id]),
+            data,
+            content_type="application/octet-stream",
+            headers=headers,
+        )
+
+    def test_chunks_in_order_complete_the_upload(self):
+        upload_id = self.start()
+        for offset in range(0, len(PDF), 256):
+            response = self.send(upload_id, offset, PDF[offset : offset + 256])
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                response["Upload-Offset"], str(min(offset + 256, len(PDF)))
+            )
+
+        upload = ContractUpload.objects.get(id=upload_id)
+        self.assertEqual(upload.status, UPLOAD_COMPLETE)
+        self.assertEqual(upload.content_type, "application/pdf")
+        contract = upload.contract
+        self.assertEqual(contract.file_hash, hashlib.sha256(PDF).hexdigest())
+        with open(self.media_root / contract.file_path.name, "rb") as f:
+            self.assertEqual(f.read(), PDF)
+        self.assertFalse(os.path.exists(upload.temp_path))
+        self.process_contract_task.assert_called_once_with(contract.id)
+
+    def test_unexpected_offset_is_rejected_with_current_offset(self):
+        upload_id = self.start()
+        self.send(upload_id, 0, PDF[:256])
+
+        response = self.send(upload_id, 512, PDF[512:768])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Upload-Offset"], "256")
+
+        response = self.send(upload_id, 0, PDF[:256])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(ContractUpload.objects.get(id=upload_id).received_size, 256)
+
+    def test_interrupted_upload_resumes_from_reported_offset(self):
+        upload_id = self.start()
+        self.send(upload_id, 0, PDF[:256])
+
+        response = self.client.get(
+            reverse("api_contract_upload_chunk", args=[upload_id])
+        )
+        self.assertEqual(response.json()["offset"], 256)
+
+        offset = int(response["Upload-Offset"])
+        while offset < len(PDF):
+            response = self.send(upload_id, offset, PDF[offset : offset + 256])
+            offset = int(response["Upload-Offset"])
+        upload = ContractUpload.objects.get(id=upload_id)
+        self.assertEqual(upload.status, UPLOAD_COMPLETE)
+        self.assertEqual(upload.contract.file_hash, hashlib.sha256(PDF).hexdigest())
+
+    def test_checksum_mismatch_keeps_offset_and_chunk_can_be_resent(self):
+        upload_id = self.start()
+        chunk = PDF[:256]
+
+        response = self.send(upload_id, 0, chunk, checksum="0" * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response["Upload-Offset"], "0")
+        self.assertEqual(ContractUpload.objects.get(id=upload_id).received_size, 0)
+
+        response = self.send(
+            upload_id, 0, chunk, checksum=hashlib.sha256(chunk).hexdigest()
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Upload-Offset"], "256")
+
+    def test_unsupported_file_type_is_rejected(self):
+        upload_id = self.start(size=256)
+        response = self.send(upload_id, 0, b"MZ" + b"\0" * 254)
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(ContractUpload.objects.get(id=upload_id).received_size, 0)
+
+    def test_oversized_chunk_is_rejected(self):
+        upload_id = self.start()
+        response = self.send(upload_id, 0, PDF[:257])
+        self.assertEqual(response.status_code, 413)
+
+    def test_session_body_must_be_an_object(self):
+        for body in ("[1]", '"x"', "1", "{", '{"file_name": "a.pdf"}'):
+            response = self.client.post(
+                reverse("api_start_contract_upload"),
+                body,
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 400, body)
+
+    def test_claimed_offset_rejects_concurrent_chunk(self):
+        upload_id = self.start()
+        ContractUpload.objects.filter(id=upload_id).update(writing_since=timezone.now())
+
+        response = self.send(upload_id, 0, PDF[:256])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["error"], "Concurrent chunk upload")
+
+        # A claim whose writer died is taken over
+        stale = timezone.now() - timedelta(hours=1)
+        ContractUpload.objects.filter(id=upload_id).update(writing_since=stale)
+        response = self.send(upload_id, 0, PDF[:256])
+        self.assertEqual(response.status_code, 200)
+        upload = ContractUpload.objects.get(id=upload_id)
+        self.assertEqual(upload.received_size, 256)
+        self.assertIsNone(upload.writing_since)
+
+    def test_failed_chunk_releases_its_claim(self):
+        upload_id = self.start()
+        self.send(upload_id, 0, PDF[:256], checksum="0" * 64)
+        self.assertIsNone(ContractUpload.objects.get(id=upload_id).writing_since)
+
+    def test_uploads_are_scoped_to_their_owner(self):
+        owner = User.objects.create_user("owner")
+        self.client.force_login(owner)
+        upload_id = self.start()
+        url = reverse("api_contract_upload_chunk", args=[upload_id])
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.client.force_login(User.objects.create_user("other"))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.send(upload_id, 0, PDF[:256]).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(ContractUpload.objects.get(id=upload_id).received_size, 0)
+
+    def test_single_shot_upload_applies_upload_limits(self):
+        url = reverse("api_upload_contract")
+        with mock.patch("documents.api.process_contract_task") as task:
+            response = self.client.post(
+                url, {"file": SimpleUploadedFile("a.exe", b"MZ" + b"\0" * 254)}
+            )
+            self.assertEqual(response.status_code, 415)
+            with override_settings(CONTRACT_UPLOAD_MAX_SIZE=len(PDF) - 1):
+                response = self.client.post(
+                    url, {"file": SimpleUploadedFile("a.pdf", PDF)}
+                )
+                self.assertEqual(response.status_code, 413)
+            self.assertFalse(Contract.objects.exists())
+            task.assert_not_called()
+
+            response = self.client.post(url, {"file": SimpleUploadedFile("a.pdf", PDF)})
+            self.assertEqual(response.status_code, 200)
+            task.assert_called_once()
+
+    def test_expired_uploads_and_orphan_files_are_removed(self):
+        stale_id = self.start()
+        fresh_id = self.start()
+        old = timezone.now() - timedelta(days=2)
+        ContractUpload.objects.filter(id=stale_id).update(updated_at=old)
+        stale_path = ContractUpload.objects.get(id=stale_id).temp_path
+        fresh_path = ContractUpload.objects.get(id=fresh_id).temp_path
+        orphan = self.media_root / "uploads" / "orphan.part"
+        orphan.touch()
+        os.utime(orphan, (old.timestamp(), old.timestamp()))
+
+        self.assertEqual(expire_uploads(max_age=60 * 60), 2)
+        self.assertFalse(ContractUpload.objects.filter(id=stale_id).exists())
+        self.assertFalse(os.path.exists(stale_path))
+        self.assertFalse(orphan.exists())
+        self.assertTrue(os.path.exists(fresh_path))
+
+
+class UUReferenceChunkTests(TestCase):
+    """Streaming parser output for UU 13/2003, as embedded in Chroma."""
+
+    SOURCE = "media/uu_13_2003_gemini.md"
+    # sha256 of the ids, documents and metadata before the parser streamed
+    DIGEST = "0f2ebf0ac143a4aeddb2776f0f259c8a8bd39e76b161241dbc1316714eedc758"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ids, cls.documents, cls.metadatas = build_uu_reference_chunks(cls.SOURCE)
+
+    def test_one_chunk_per_pasal(self):
+        self.assertEqual(len(self.ids), 193)
+        self.assertEqual(len(set(self.ids)), 193)
+        self.assertEqual(
+            [m["pasal_number"] for m in self.metadatas],
+            [str(n) for n in range(1, 194)],
+        )
+        self.assertEqual(self.ids[0], "uu_reference_BABI_PASAL1")
+        self.assertEqual(self.ids[-1], "uu_reference_BABXVIII_PASAL193")
+        self.assertTrue(self.documents[0].startswith("### Pasal 1\n"))
+
+    def test_output_matches_the_baseline(self):
+        dump = json.dumps(
+            (self.ids, self.documents, self.metadatas),
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        self.assertEqual(hashlib.sha256(dump.encode()).hexdigest(), self.DIGEST)
+
+
+class FakeCollection:
+    """Chroma collection stand-in; vector search returns `vector_ids`."""
+
+    def __init__(self, chunks, vector_ids=()):
+        self.records = {
+            "ids": [cid for cid, _, _ in chunks],
+            "documents": [document for _, document, _ in chunks],
+            "metadatas": [metadata for _, _, metadata in chunks],
+        }
+        self.vector_ids = list(vector_ids)
+        self.queries = []
+
+    def get(self, include):
+        return self.records
+
+    def query(self, **kwargs):
+        self.queries.append(kwargs)
+        return {"ids": [self.vector_ids]}
+
+
+CHUNKS = [
+    ("uu_PASAL1", "### Pasal 1\nUpah adalah hak pekerja.", {"pasal_number": "1"}),
+    (
+        "uu_PASAL2",
+        "### Pasal 2\nUpah lembur dibayar sesuai Pasal 10 dan Pasal 3.",
+        # As written by the parser: sorted as strings
+        {"pasal_number": "2", "cross_references": "10,2,3"},
+    ),
+    (
+        "uu_PASAL3",
+        "### Pasal 3\nWaktu kerja lembur paling lama tiga jam sehari.",
+        {"pasal_number": "3"},
+    ),
+    (
+        "uu_PASAL10",
+        "### Pasal 10\nPesangon dibayar saat pemutusan hubungan kerja.",
+        {"pasal_number": "10"},
+    ),
+]
+
+
+class RetrievalTests(SimpleTestCase):
+    """BM25 scoring, rank fusion and Pasal lookups of HybridRetriever."""
+
+    def retriever(self, vector_ids=()):
+        return HybridRetriever(FakeCollection(CHUNKS, vector_ids))
+
+    def test_extract_pasal_numbers(self):
+        self.assertEqual(
+            extract_pasal_numbers("Apa isi pasal 59 dan Pasal 61a? Lalu pasal 59."),
+            ["59", "61A"],
+        )
+        self.assertEqual(extract_pasal_numbers("Pasal 059"), ["59"])
+        self.assertEqual(extract_pasal_numbers("Berapa lama masa percobaan?"), [])
+
+    def test_pasal_sort_key_is_numeric(self):
+        self.assertEqual(
+            sorted(["10", "2", "61A", "61", "1"], key=pasal_sort_key),
+            ["1", "2", "10", "61", "61A"],
+        )
+
+    def test_bm25_prefers_rare_terms_and_short_documents(self):
+        index = BM25Index(["upah pekerja", "upah lembur lembur pekerja", "cuti"])
+        self.assertEqual([p for p, _ in index.search("lembur")], [1])
+        self.assertEqual([p for p, _ in index.search("upah")], [0, 1])
+        self.assertEqual(index.search("upah", n_results=1)[0][0], 0)
+        self.assertEqual(index.search("pesangon"), [])
+        lembur = dict(index.search("upah lembur"))
+        self.assertGreater(lembur[1], lembur[0])
+
+    def test_lexical_and_vector_ranks_are_fused(self):
+        retriever = self.retriever(vector_ids=["uu_PASAL3", "uu_PASAL10"])
+        lexical = [p for p, _ in retriever.bm25.search("upah lembur", 10)]
+        self.assertEqual(lexical[0], 1)
+
+        hits = retriever.query("upah lembur", n_results=2, query_embedding=[0.1])
+
+        # Pasal 3 is found by both indexes, Pasal 2 ranks first lexically
+        self.assertEqual([hit["id"] for hit in hits], ["uu_PASAL3", "uu_PASAL2"])
+        self.assertEqual({hit["source"] for hit in hits}, {"hybrid"})
+        self.assertAlmostEqual(hits[0]["score"], 1 / 61 + 1 / (61 + lexical.index(2)))
+        self.assertAlmostEqual(hits[1]["score"], 1 / 61)
+        self.assertEqual(retriever.collection.queries[0]["query_embeddings"], [[0.1]])
+
+    def test_named_pasal_is_looked_up_without_vector_search(self):
+        retriever = self.retriever()
+        hits = retriever.query("Apa isi Pasal 10?", n_results=2)
+        self.assertEqual(hits[0]["id"], "uu_PASAL10")
+        self.assertEqual(hits[0]["source"], "pasal")
+        self.assertEqual(retriever.collection.queries, [])
+
+    def test_references_are_expanded_in_pasal_order(self):
+        retriever = self.retriever()
+        self.assertEqual(retriever.reference_graph["2"], ["3", "10"])
+
+        hits = retriever.lookup_pasal(["2"])
+        expanded = retriever.expand_references(hits, max_per_hit=1)
+        self.assertEqual([hit["id"] for hit in expanded], ["uu_PASAL2", "uu_PASAL3"])
+        self.assertEqual(expanded[1]["referenced_by"], "2")
+
+        expanded = retriever.expand_references(
+            hits, max_per_hit=1, question="pesangon pemutusan hubungan kerja"
+        )
+        self.assertEqual(expanded[1]["id"], "uu_PASAL10")
+
+        self.assertEqual(retriever.expand_references(hits, token_budget=1), hits)
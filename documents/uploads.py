@@ -0,0 +1,267 @@
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import UPLOAD_COMPLETE, UPLOAD_IN_PROGRESS, Contract, ContractUpload
+from .tasks import process_contract_task
+
+# Bytes read from the request / file per iteration
+BLOCK_SIZE = 64 * 1024
+# A chunk claimed longer ago than this is taken over (its writer died)
+CLAIM_TIMEOUT = 60 * 10
+# Room for multipart boundaries and headers around a single-shot upload
+MULTIPART_OVERHEAD = 64 * 1024
+
+FILE_SIGNATURES = {
+    b"%PDF-": "application/pdf",
+    b"\x89PNG\r\n\x1a\n": "image/png",
+    b"\xff\xd8\xff": "image/jpeg",
+    b"PK\x03\x04": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def sniff_content_type(head: bytes) -> str | None:
+    for signature, content_type in FILE_SIGNATURES.items():
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+def validate_upload(file_name: str, total_size: int) -> str:
+    """Checks the name and size of an upload; returns the cleaned file name."""
+    file_name = os.path.basename(file_name or "").strip()
+    if not file_name:
+        raise UploadError("file_name is required")
+    if total_size <= 0:
+        raise UploadError("size must be positive")
+    if total_size > settings.CONTRACT_UPLOAD_MAX_SIZE:
+        raise UploadError(
+            f"File exceeds the {settings.CONTRACT_UPLOAD_MAX_SIZE} byte limit",
+            status=413,
+        )
+    return file_name
+
+
+def check_request_size(content_length) -> None:
+    """Rejects a single-shot upload request before its body is parsed."""
+    try:
+        content_length = int(content_length or 0)
+    except ValueError:
+        raise UploadError("Invalid Content-Length")
+    if content_length > settings.CONTRACT_UPLOAD_MAX_SIZE + MULTIPART_OVERHEAD:
+        raise UploadError(
+            f"File exceeds the {settings.CONTRACT_UPLOAD_MAX_SIZE} byte limit",
+            status=413,
+        )
+
+
+def validate_file(uploaded_file) -> str:
+    """
+    Applies the limits of chunked uploads to a single-shot upload: size and
+    file type. Returns the cleaned file name.
+    """
+    file_name = validate_upload(uploaded_file.name, uploaded_file.size)
+    head = uploaded_file.read(BLOCK_SIZE)
+    uploaded_file.seek(0)
+    if sniff_content_type(head) is None:
+        raise UploadError("Unsupported file type", status=415)
+    return file_name
+
+
+def start_upload(file_name: str, total_size: int, user=None) -> ContractUpload:
+    file_name = validate_upload(file_name, total_size)
+
+    upload = ContractUpload(file_name=file_name, total_size=total_size, user=user)
+    os.makedirs(settings.CONTRACT_UPLOAD_TEMP_DIR, exist_ok=True)
+    upload.temp_path = str(settings.CONTRACT_UPLOAD_TEMP_DIR / f"{upload.id}.part")
+    open(upload.temp_path, "wb").close()
+    upload.save()
+    return upload
+
+
+def write_chunk(
+    upload: ContractUpload, offset: int, stream, length: int, checksum=None
+):
+    """
+    Streams one chunk from `stream` into the upload's temp file at `offset`,
+    hashing and validating it on the fly. Memory use is bounded by
+    BLOCK_SIZE regardless of chunk or file size. The offset is claimed with
+    a conditional UPDATE before the body is read, so a concurrent chunk for
+    the same upload is rejected before it touches the file, and no row lock
+    or transaction is held while a slow client sends the body. The offset
+    only advances once the chunk is complete and valid, so a dropped chunk
+    can be resent.
+    """
+    if length <= 0 or length > settings.CONTRACT_UPLOAD_CHUNK_SIZE:
+        raise UploadError(
+            f"Chunks must be 1-{settings.CONTRACT_UPLOAD_CHUNK_SIZE} bytes", status=413
+        )
+    if offset + length > upload.total_size:
+        raise UploadError("Chunk exceeds the declared size", status=413)
+
+    claimed_at = _claim_offset(upload, offset)
+    claim = ContractUpload.objects.filter(id=upload.id, writing_since=claimed_at)
+    try:
+        content_type = _write_claimed_chunk(upload, offset, stream, length, checksum)
+    except BaseException:
+        claim.update(writing_since=None)
+        raise
+
+    fields = {"received_size": offset + length, "writing_since": None}
+    if content_type:
+        fields["content_type"] = content_type
+    if not claim.update(updated_at=timezone.now(), **fields):
+        raise UploadError("Chunk claim expired", status=409)
+
+    upload.refresh_from_db()
+    if upload.received_size == upload.total_size:
+        finish_upload(upload)
+    return upload
+
+
+def _claim_offset(upload: ContractUpload, offset: int):
+    """
+    Marks the upload as being written at `offset` and returns the claim's
+    timestamp, or raises why the chunk cannot be accepted.
+    """
+    claimed_at = timezone.now()
+    free = Q(writing_since__isnull=True) | Q(
+        writing_since__lt=claimed_at - timedelta(seconds=CLAIM_TIMEOUT)
+    )
+    claimed = ContractUpload.objects.filter(
+        free, id=upload.id, status=UPLOAD_IN_PROGRESS, received_size=offset
+    ).update(writing_since=claimed_at)
+    if claimed:
+        return claimed_at
+
+    current = ContractUpload.objects.filter(id=upload.id).first()
+    if current is None:
+        raise UploadError("Upload not found", status=404)
+    if current.status != UPLOAD_IN_PROGRESS:
+        raise UploadError("Upload already completed", status=409)
+    if current.received_size != offset:
+        raise UploadError("Unexpected offset", status=409, offset=current.received_size)
+    raise UploadError(
+        "Concurrent chunk upload", status=409, offset=current.received_size
+    )
+
+
+def _write_claimed_chunk(upload, offset, stream, length, checksum) -> str | None:
+    """Writes the chunk and returns the sniffed content type of a first chunk."""
+    content_type = None
+    digest = hashlib.sha256()
+    written = 0
+    with open(upload.temp_path, "r+b") as f:
+        f.seek(offset)
+        f.truncate()
+        while written < length:
+            block = stream.read(min(BLOCK_SIZE, length - written))
+            if not block:
+                break
+            if offset == 0 and written == 0:
+                content_type = sniff_content_type(block)
+                if content_type is None:
+                    raise UploadError("Unsupported file type", status=415)
+            f.write(block)
+            digest.update(block)
+            written += len(block)
+
+    if written != length:
+        raise UploadError("Incomplete chunk", offset=offset)
+    if checksum and checksum.lower() != digest.hexdigest():
+        raise UploadError("Chunk checksum mismatch", offset=offset)
+    return content_type
+
+
+def finish_upload(upload: ContractUpload) -> Contract | None:
+    """
+    Moves the assembled file into the documents storage, creates its
+    Contract and enqueues processing. Only the request that flips the
+    status runs this, so the task is enqueued once.
+    """
+    claimed = ContractUpload.objects.filter(
+        id=upload.id, status=UPLOAD_IN_PROGRESS
+    ).update(status=UPLOAD_COMPLETE)
+    if not claimed:
+        return None
+
+    digest = hashlib.sha256()
+    with open(upload.temp_path, "rb") as f:
+        while block := f.read(BLOCK_SIZE):
+            digest.update(block)
+
+    name = default_storage.get_available_name(f"documents/{upload.file_name}")
+    destination = os.path.join(settings.MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    os.replace(upload.temp_path, destination)
+
+    contract = Contract(
+        file_name=upload.file_name, file_hash=digest.hexdigest(), user_id=upload.user_id
+    )
+    contract.file_path.name = name
+    contract.save()
+
+    upload.status = UPLOAD_COMPLETE
+    upload.contract = contract
+    upload.save(update_fields=["contract", "updated_at"])
+
+    process_contract_task(contract.id)
+    return contract
+
+
+def _remove_file(path: str) -> int:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return 0
+    return 1
+
+
+def expire_uploads(max_age: int | None = None) -> int:
+    """
+    Deletes uploads that received no chunk for `max_age` seconds
+    (CONTRACT_UPLOAD_EXPIRY) together with their temp files, and .part
+    files no unfinished upload refers to. Returns the number of files
+    removed.
+    """
+    max_age = max_age or settings.CONTRACT_UPLOAD_EXPIRY
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    removed = 0
+
+    stale = ContractUpload.objects.filter(
+        status=UPLOAD_IN_PROGRESS, updated_at__lt=cutoff
+    )
+    for upload in stale.only("id", "temp_path"):
+        # Kept if a chunk arrived since it was listed
+        deleted, _ = stale.filter(id=upload.id).delete()
+        if deleted:
+            removed += _remove_file(upload.temp_path)
+
+    if not os.path.isdir(settings.CONTRACT_UPLOAD_TEMP_DIR):
+        return removed
+    live = set(
+        ContractUpload.objects.filter(status=UPLOAD_IN_PROGRESS).values_list(
+            "temp_path", flat=True
+        )
+    )
+    with os.scandir(settings.CONTRACT_UPLOAD_TEMP_DIR) as entries:
+        for entry in entries:
+            if (
+                entry.name.endswith(".part")
+                and entry.path not in live
+                and entry.stat().st_mtime < cutoff.timestamp()
+            ):
+                removed += _remove_file(entry.path)
+    return removed
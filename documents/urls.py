@@ -1,6 +1,14 @@
 from django.urls import path
 
-from .api import ContractRetrieveAPI, ContractStatusAPI, ContractUploadAPI
+from .api import (
+    ContractReportAPI,
+    ContractRetrieveAPI,
+    ContractStatusAPI,
+    ContractStatusWatchAPI,
+    ContractUploadAPI,
+    ContractUploadChunkAPI,
+    ContractUploadSessionAPI,
+)
 from .views import DocumentUploadView
 
 urlpatterns = [
@@ -10,6 +18,16 @@ urlpatterns = [
         ContractUploadAPI.as_view(),
         name="api_upload_contract",
     ),
+    path(
+        "api/v1/contracts/uploads",
+        ContractUploadSessionAPI.as_view(),
+        name="api_start_contract_upload",
+    ),
+    path(
+        "api/v1/contracts/uploads/<uuid:upload_id>",
+        ContractUploadChunkAPI.as_view(),
+        name="api_contract_upload_chunk",
+    ),
     path(
         "api/v1/contracts",
         ContractRetrieveAPI.as_view(),
@@ -20,4 +38,14 @@ urlpatterns = [
         ContractStatusAPI.as_view(),
         name="api_get_status_contract",
     ),
+    path(
+        "api/v1/contracts/<uuid:contract_id>/report",
+        ContractReportAPI.as_view(),
+        name="api_get_report_contract",
+    ),
+    path(
+        "api/v1/contracts/status/<uuid:contract_id>/watch",
+        ContractStatusWatchAPI.as_view(),
+        name="api_watch_status_contract",
+    ),
 ]
@@ -1,25 +1,58 @@
-from django.shortcuts import redirect, render
+import uuid
+
+from django.db.models import Q
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.views import View
 
 from .models import Contract
 from .tasks import process_contract_task
+from .uploads import UploadError, check_request_size, validate_file
 
 
 class DocumentUploadView(View):
     template_name = "documents/index.html"
 
     def get(self, request):
-        return render(request, self.template_name)
+        context = {}
+        # After an upload the page follows the contract's progress
+        if contract_id := request.GET.get("contract"):
+            try:
+                contract_id = uuid.UUID(contract_id)
+            except ValueError:
+                raise Http404("Contract not found")
+            owner = Q(user__isnull=True)
+            if request.user.is_authenticated:
+                owner |= Q(user=request.user)
+            context["contract"] = get_object_or_404(
+                Contract.objects.filter(owner), id=contract_id
+            )
+        return render(request, self.template_name, context)
 
     def post(self, request):
+        try:
+            check_request_size(request.headers.get("Content-Length"))
+        except UploadError as e:
+            return render(
+                request, self.template_name, {"error": str(e)}, status=e.status
+            )
+
         uploaded_file = request.FILES.get("file_path")
         if not uploaded_file:
             return render(request, self.template_name, {"error": "No file uploaded"})
+        try:
+            file_name = validate_file(uploaded_file)
+        except UploadError as e:
+            return render(
+                request, self.template_name, {"error": str(e)}, status=e.status
+            )
 
         contract = Contract(file_path=uploaded_file)
-        contract.file_name = uploaded_file.name
+        contract.file_name = file_name
+        if request.user.is_authenticated:
+            contract.user = request.user
         contract.save()
 
         process_contract_task(contract.id)
-        return redirect(reverse("chat", kwargs={"contract_id": contract.id}))
+        return redirect(f"{reverse('documents')}?contract={contract.id}")